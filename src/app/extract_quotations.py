@@ -1,12 +1,35 @@
 import os
+import argparse
+import json
+import numpy as np
 import pandas as pd
-import re
+from concurrent.futures import ProcessPoolExecutor
 from src.lib.pdf_reader import PDFReader
+from src.lib.ocr_cache import OCRCache
+from src.lib.ocr_render import DEFAULT_PROFILE
+from src.lib.manifest import Manifest
+from src.lib.file_discovery import scan_files
+from src.lib.workbook_stream import write_frame_streaming
+from src.lib.excel_reader import read_sheet_values, frame_with_header
+from src.lib import header_detect
+from src.lib import patterns
+from src.lib import instrumentation
+from src.lib import table_grid
+from src.lib import vendor_profiles
 import pdfplumber
 
 # Configuration
 INPUT_DIR = '見積書'
 OUTPUT_FILE = 'quotation_summary.xlsx'
+OCR_CACHE_DIR = '.ocr_cache'  # Per-page OCR results, reused while the PDF is unchanged
+OCR_CACHE_MAX_BYTES = 200 * 1024 * 1024
+OCR_PROFILE = DEFAULT_PROFILE  # Render settings for OCR (see src/lib/ocr_render.py)
+OCR_BATCH_PAGES = 4  # Scanned pages read together in one batched OCR call (1 = page by page)
+OCR_BATCH_SIZE = 16  # Text boxes per recogniser pass (see ocr_render.readtext_many)
+OCR_CELLS = True  # Ruled tables: recognise cell by cell, skipping the text detector (see src/lib/cell_ocr.py)
+MANIFEST_FILE = '.extract_manifest.json'  # Processed files and their rows (--incremental)
+EXTRACTOR_VERSION = 1  # Bump when the parsing changes, so --incremental does not reuse rows of older code
+VENDOR_PROFILES = True  # Known vendors: fixed columns from config/vendor_profiles.json (e.g. QTKG's two header rows)
 KEYWORDS = {
     'product': ['品名', '商品名', '商品', '名称', '銘柄'],
     'quantity': ['数量', '数'],
@@ -14,129 +37,185 @@ KEYWORDS = {
     'unit_price': ['単価', '単価(税別)', '単価（税別）'],
     'amount': ['金額', '合計金額(税別)', '合計金額']
 }
+TABLE_END_MARKERS = ('合計', '小計')  # A PDF table ends at the first row containing one of these
+OUTPUT_COLUMNS = ['ファイル名', '品名', '図番/型番', '数量', '単位', '単価', '金額']
 
-def find_header_row(df, keywords):
+HEADER_PATTERNS = header_detect.compile_keyword_patterns(KEYWORDS)
+
+def find_header_row(df, patterns=HEADER_PATTERNS):
     """Find the index of the header row based on keywords."""
-    for idx, row in df.iterrows():
-        row_str = " ".join([str(x) for x in row if pd.notna(x)])
-        # Check if at least one keyword from each mandatory category exists
-        if any(k in row_str for k in KEYWORDS['product']) and \
-           any(k in row_str for k in KEYWORDS['amount']):
-            return idx
-    return None
-
-def extract_from_excel(file_path):
-    """Extract data from Excel file."""
-    try:
-        # Read all sheets (or specific one? defaulting to first usually works but let's check)
-        # Using openpyxl engine
-        df_raw = pd.read_excel(file_path, header=None)
-        
-        header_idx = find_header_row(df_raw, KEYWORDS)
-        if header_idx is None:
-            return []
+    # Check if at least one keyword from each mandatory category exists
+    return header_detect.find_header_row(df, patterns, required=('product', 'amount'))
 
-        # Reload with correct header
-        df = pd.read_excel(file_path, header=header_idx)
-        
-        # Identify columns
-        cols = df.columns
-        col_map = {}
-        for col in cols:
-            col_str = str(col)
-            for key, words in KEYWORDS.items():
-                if any(word == col_str for word in words) or any(word in col_str for word in words):
-                    if key not in col_map: 
-                        col_map[key] = col
-        
-        # specific handling for '図番'/'型番' which might be in '図番' column or separate
-        # If not found, look for '図番' specific keywords
-        if 'model_number' not in col_map:
-             for col in cols:
-                if '図番' in str(col) or '型番' in str(col):
-                    col_map['model_number'] = col
-                    break
-
-        if 'product' not in col_map:
-            return []
-
-        results = []
-        for _, row in df.iterrows():
-            if pd.isna(row[col_map['product']]): continue
-            
-            # Stop if "Total" or similar is found in product name (heuristic)
-            if '合計' in str(row[col_map['product']]): break
-            
-            item = {
-                'ファイル名': os.path.basename(file_path),
-                '品名': row[col_map['product']],
-                '図番/型番': row[col_map.get('model_number')] if 'model_number' in col_map else '',
-                '数量': row[col_map.get('quantity')] if 'quantity' in col_map else 0,
-                '単位': row[col_map.get('unit')] if 'unit' in col_map else '',
-                '単価': row[col_map.get('unit_price')] if 'unit_price' in col_map else 0,
-                '金額': row[col_map.get('amount')] if 'amount' in col_map else 0,
-            }
-            results.append(item)
-        return results
+def empty_items():
+    """Empty result frame with the summary columns."""
+    return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+def extract_from_excel(file_path, raise_errors=False):
+    """
+    Extract data from Excel file as a DataFrame with OUTPUT_COLUMNS.
+    :param raise_errors: Re-raise a failure after reporting it (default: return no rows).
+    """
+    try:
+        # Load the first sheet once; header detection and data extraction both use it
+        df_raw = read_sheet_values(file_path)
+        filename = os.path.basename(file_path)
+        profile = vendor_profiles.find_profile(filename, df_raw) if VENDOR_PROFILES else None
+        if profile is not None:
+            items = items_from_profile(df_raw, filename, profile)
+            instrumentation.incr('vendor_profile', result='hit' if not items.empty else 'empty')
+            if not items.empty:
+                return items
+        return items_from_frame(df_raw, filename)
 
     except Exception as e:
         print(f"Error processing Excel {file_path}: {e}")
-        return []
+        instrumentation.incr('errors', kind='excel')
+        if raise_errors:
+            raise
+        return empty_items()
 
-        return results
+def items_from_frame(df_raw, filename, header_idx=None):
+    """
+    Items below the header row of a sheet-like frame (Excel sheet or PDF cell grid).
+    :param df_raw: Cell values without header (as read_sheet_values()).
+    :param header_idx: Index label of the header row; searched when None.
+    :return: DataFrame with OUTPUT_COLUMNS.
+    """
+    if header_idx is None:
+        header_idx = find_header_row(df_raw)
+    if header_idx is None:
+        return empty_items()
 
-    except Exception as e:
-        print(f"Error processing PDF {file_path}: {e}")
-        return []
+    # Re-slice with correct header (no second parse of the workbook)
+    df = frame_with_header(df_raw, header_idx)
+        
+    # Identify columns
+    cols = df.columns
+    col_map = {}
+    for col in cols:
+        col_str = str(col)
+        for key, words in KEYWORDS.items():
+            if any(word == col_str for word in words) or any(word in col_str for word in words):
+                if key not in col_map: 
+                    col_map[key] = col
+    
+    # specific handling for '図番'/'型番' which might be in '図番' column or separate
+    # If not found, look for '図番' specific keywords
+    if 'model_number' not in col_map:
+         for col in cols:
+            if '図番' in str(col) or '型番' in str(col):
+                col_map['model_number'] = col
+                break
+
+    if 'product' not in col_map:
+        return empty_items()
+
+    product = df[col_map['product']]
+
+    # Stop at the first "Total" or similar in product name (heuristic)
+    is_total = product.where(product.notna(), '').astype(str).str.contains('合計', regex=False)
+    total_pos = np.flatnonzero(is_total.to_numpy(dtype=bool))
+    if len(total_pos):
+        df = df.iloc[:total_pos[0]]
+    df = df[df[col_map['product']].notna()]
+
+    def column(key, default):
+        return df[col_map[key]] if key in col_map else default
+
+    return pd.DataFrame({
+        'ファイル名': filename,
+        '品名': df[col_map['product']],
+        '図番/型番': column('model_number', ''),
+        '数量': column('quantity', 0),
+        '単位': column('unit', ''),
+        '単価': column('unit_price', 0),
+        '金額': column('amount', 0),
+    }, columns=OUTPUT_COLUMNS).reset_index(drop=True)
+
+def items_from_profile(df_raw, filename, profile):
+    """
+    Items of a sheet with a known vendor layout, read from the profile's fixed columns.
+    :return: DataFrame with OUTPUT_COLUMNS (empty if no row has a name or part number).
+    """
+    body = vendor_profiles.table_body(df_raw, profile)
+    keys = [k for k in ('name', 'part_no') if k in body]
+    if not keys:
+        return empty_items()
+    body = body[body[keys].notna().any(axis=1)]
+
+    def column(key, default):
+        return body[key] if key in body else default
+
+    return pd.DataFrame({
+        'ファイル名': filename,
+        '品名': column('name', ''),
+        '図番/型番': column('part_no', ''),
+        '数量': column('quantity', 0),
+        '単位': column('unit', ''),
+        '単価': column('unit_price', 0),
+        '金額': column('amount', 0),
+    }, columns=OUTPUT_COLUMNS).reset_index(drop=True)
 
 def parse_ocr_text(text, filename):
     """Parse OCR text using multiple strategies."""
+    return parse_ocr_pages([text], filename)
+
+def parse_ocr_pages(pages, filename):
+    """
+    Parse OCR text page by page using multiple strategies.
+    Pages are consumed as they arrive (e.g. from PDFReader.iter_pages), so the
+    document text is never joined into one string.
+    :param pages: Iterable of page texts.
+    """
     results = []
-    lines = text.split('\n')
-    lines = [line.strip() for line in lines if line.strip()] # Clean empty lines
+    lines = [] # Clean non-empty lines, kept for the vertical strategy
 
     # Strategy 1: Horizontal Line Parsing (e.g., "Product 1 Unit 1000 1000")
     # Regex: Product (non-space) | Qty (digits) | Unit | Price | Amount
     # Note: Product might contain spaces, but usually last 4 tokens are Qty, Unit, Price, Amount
     horizontal_items = []
     
-    # Simple regex for lines ending with two numbers (Price, Amount)
-    # Allows for '¥', ',', '-', '.'
-    price_pattern = r'[¥￥]?[\d,]+(?:\.\d+)?[-－]?'
-    
-    # Regex to find line ending with: Qty Unit Price Amount
-    # \s+ is separator
+    # Lines ending with: Qty Unit Price Amount (patterns.OCR_ITEM_LINE, precompiled)
+    # Price/Amount allow '¥', ',', '-', '.'
     # Group 1: Product (everything before)
     # Group 2: Qty
     # Group 3: Unit
     # Group 4: Unit Price
     # Group 5: Amount
-    line_regex = re.compile(fr'(.*?)\s+(\d+)\s+([^\s\d]+)\s+({price_pattern})\s+({price_pattern})$')
-
-    for line in lines:
-        match = line_regex.search(line)
-        if match:
-            # Validate if it looks like a valid line (e.g. price and amount are numbers)
-            try:
-                p_name = match.group(1).strip()
-                qty = match.group(2)
-                unit = match.group(3)
-                u_price = match.group(4)
-                amount = match.group(5)
-                
-                # Filter out likely false positives (e.g. date strings)
-                if len(p_name) > 1:
-                    horizontal_items.append({
-                        'ファイル名': filename,
-                        '品名': p_name,
-                        '図番/型番': '',
-                        '数量': float(qty),
-                        '単位': unit,
-                        '単価': u_price,
-                        '金額': amount
-                    })
-            except:
-                pass
+    line_regex = patterns.OCR_ITEM_LINE
+
+    for page_text in pages:
+        # Only the parsing is timed here; getting the next page (text/OCR) has its own spans
+        with instrumentation.span('parse.page', file=filename):
+            for line in page_text.split('\n'):
+                line = line.strip()
+                if not line: continue
+                lines.append(line)
+
+                match = line_regex.search(line)
+                if match:
+                    # Validate if it looks like a valid line (e.g. price and amount are numbers)
+                    try:
+                        p_name = match.group(1).strip()
+                        qty = match.group(2)
+                        unit = match.group(3)
+                        u_price = match.group(4)
+                        amount = match.group(5)
+                    
+                        # Filter out likely false positives (e.g. date strings)
+                        if len(p_name) > 1:
+                            horizontal_items.append({
+                                'ファイル名': filename,
+                                '品名': p_name,
+                                '図番/型番': '',
+                                '数量': float(qty),
+                                '単位': unit,
+                                '単価': u_price,
+                                '金額': amount
+                            })
+                    except:
+                        pass
     
     if len(horizontal_items) > 0:
         return horizontal_items
@@ -147,10 +226,10 @@ def parse_ocr_text(text, filename):
     vertical_items = []
     
     def is_price(s):
-        return re.match(f'^{price_pattern}$', s) is not None
+        return patterns.PRICE.match(s) is not None
     
     def is_qty(s):
-        return re.match(r'^\d+$', s) is not None
+        return patterns.QUANTITY.match(s) is not None
 
     i = 0
     while i < len(lines) - 1:
@@ -202,53 +281,242 @@ def parse_ocr_text(text, filename):
         
     return vertical_items
 
-def extract_from_pdf(file_path, reader):
-    """Extract data from PDF using PDFReader (text/OCR) + Parsing."""
+def items_from_tokens(tokens, filename, table=None, rules=None, end_markers=TABLE_END_MARKERS):
+    """
+    Items of one page from its positioned tokens (text-layer words / OCR boxes).
+    The tokens are clustered into a cell grid below the header row, which then goes
+    through the same column mapping as an Excel sheet.
+    :param table: (column bands, header cells) of the table on the previous page, used
+                  when this page continues it without repeating the header.
+    :param rules: Vertical ruling lines of the page (column separators of ruled tables).
+    :param end_markers: The table ends at the first row containing one of these.
+    :return: (DataFrame with OUTPUT_COLUMNS or None if the page has no table, table for the next page)
+    """
+    rows = table_grid.token_rows(tokens)
+    start = table_grid.find_header(rows, HEADER_PATTERNS, required=('product', 'amount'))
+    if start is not None:
+        grid, bands = table_grid.build_grid(rows[start:], rules=rules)
+        table = (bands, grid.iloc[0].tolist())
+    elif table is not None:
+        # Continued table: same columns, header cells of the previous page on top
+        bands, header = table
+        rows = [row for row in rows if len(row) >= 2] # skip page titles/footers
+        grid, _ = table_grid.build_grid(rows, bands, header=False)
+        grid = pd.concat([pd.DataFrame([header], dtype=object), grid], ignore_index=True)
+    else:
+        return None, None
+
+    # Unlike a sheet, the total may sit in any column of a PDF table (e.g. "備考 小計")
+    is_end = grid.iloc[1:].apply(lambda row: any(m in str(v) for v in row.dropna() for m in end_markers), axis=1)
+    if is_end.any():
+        grid = grid.loc[:is_end.idxmax() - 1]
+        table = None
+
+    items = items_from_frame(grid, filename, grid.index[0])
+    # Lines without any price are notes or wrapped names, not items
+    items = items[items[['単価', '金額']].notna().any(axis=1)].reset_index(drop=True)
+    if items.empty:
+        return None, table
+
+    # Grid cells are text; quantities become numbers like in the line parser
+    qty = pd.to_numeric(items['数量'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+    items['数量'] = qty.astype(object).where(qty.notna(), items['数量'])
+    return items, table
+
+def extract_from_pdf(file_path, reader, raise_errors=False):
+    """
+    Extract data from PDF using PDFReader (text/OCR) + cell grid, or text parsing as a fallback.
+    :param raise_errors: Re-raise a failure after reporting it (default: return no rows).
+    """
     try:
         filename = os.path.basename(file_path)
-        full_text = reader.extract_text(file_path)
-        
-        # Try to parse the text
-        parsed_data = parse_ocr_text(full_text, filename)
+        profile = vendor_profiles.find_profile(filename) if VENDOR_PROFILES else None
+        end_markers = profile.end_markers if profile is not None and profile.end_markers else TABLE_END_MARKERS
+        grid_items = []
+        page_texts = []
+        table = None
+        for page in reader.iter_pages(file_path):
+            page_texts.append(page['text'])
+            with instrumentation.span('parse.grid', file=filename, page=page['page']):
+                if page.get('tokens'):
+                    items, table = items_from_tokens(page['tokens'], filename, table, page.get('rules'), end_markers)
+                else:
+                    items, table = None, None
+            if items is not None:
+                grid_items.append(items)
+
+        # One structured pass: a table found from token positions is used as it is
+        if grid_items:
+            instrumentation.incr('pdf_parse', strategy='grid')
+            return pd.concat(grid_items, ignore_index=True)[OUTPUT_COLUMNS]
+
+        # No table header found (or old cache entries without tokens): parse the text
+        parsed_data = parse_ocr_pages(page_texts, filename)
         if parsed_data:
-            return parsed_data
+            instrumentation.incr('pdf_parse', strategy='text')
+            return pd.DataFrame(parsed_data, columns=OUTPUT_COLUMNS)
             
-        return [] # Return empty if no strategy worked (or implement table extraction fallback here if needed)
+        return empty_items()
 
     except Exception as e:
         print(f"Error processing PDF {file_path}: {e}")
-        return []
+        instrumentation.incr('errors', kind='pdf')
+        if raise_errors:
+            raise
+        return empty_items()
 
-def main():
-    all_data = []
-    reader = PDFReader() # Initialize OCR reader once
+# Per-process PDFReader for pool workers (each worker loads its own OCR model)
+_worker_reader = None
 
-    files = [f for f in os.listdir(INPUT_DIR) if f.startswith('~$') is False] # Skip temp files
-    
-    for filename in files:
-        filepath = os.path.join(INPUT_DIR, filename)
-        print(f"Processing {filename}...")
-        
-        if filename.lower().endswith(('.xlsx', '.xls')):
-            data = extract_from_excel(filepath)
-            all_data.extend(data)
-        elif filename.lower().endswith('.pdf'):
-            data = extract_from_pdf(filepath, reader)
-            all_data.extend(data)
+def _new_reader():
+    return PDFReader(cache=OCRCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES), profile=OCR_PROFILE,
+                     ocr_batch_pages=OCR_BATCH_PAGES, ocr_batch_size=OCR_BATCH_SIZE, cell_ocr=OCR_CELLS)
+
+def _init_worker():
+    global _worker_reader
+    _worker_reader = _new_reader()
+
+def process_file(filepath, reader):
+    """
+    Extract rows from one quotation file (Excel or PDF).
+    :return: (DataFrame with OUTPUT_COLUMNS, ok). ok is False if the extraction failed
+             (e.g. OCR error); such a file must not be recorded as processed.
+    """
+    filename = os.path.basename(filepath)
+    print(f"Processing {filename}...")
+
+    if filename.lower().endswith(('.xlsx', '.xls')):
+        kind = 'excel'
+    elif filename.lower().endswith('.pdf'):
+        kind = 'pdf'
+    else:
+        return empty_items(), True
+
+    ok = True
+    with instrumentation.span('extract.file', file=filename, kind=kind) as record:
+        try:
+            if kind == 'excel':
+                df = extract_from_excel(filepath, raise_errors=True)
+            else:
+                df = extract_from_pdf(filepath, reader, raise_errors=True)
+        except Exception:
+            # Already reported by the extractor
+            df, ok = empty_items(), False
+        record['rows'] = len(df)
+    instrumentation.incr('files_processed', kind=kind)
+    instrumentation.incr('rows_extracted', len(df), kind=kind)
+    return df, ok
+
+def _process_in_worker(filepath):
+    """Pool task: the rows, the ok flag and this file's metrics, which the parent merges into its own."""
+    instrumentation.METRICS.reset()
+    df, ok = process_file(filepath, _worker_reader)
+    return df, ok, instrumentation.METRICS.snapshot()
+
+def extract_files(filepaths, workers):
+    """
+    Extract every file, serially or with a process pool.
+    :return: One (DataFrame, ok) per file (see process_file), in input order.
+    """
+    results = []
+    workers = max(1, min(workers, len(filepaths)))
+    if workers == 1:
+        reader = _new_reader() # Initialize OCR reader once
+        for filepath in filepaths:
+            results.append(process_file(filepath, reader))
+    else:
+        print(f"Processing {len(filepaths)} files with {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            # map() yields results in input order, whichever worker finishes first
+            for data, ok, metrics in executor.map(_process_in_worker, filepaths):
+                instrumentation.METRICS.merge(metrics)
+                results.append((data, ok))
+    return results
+
+def manifest_settings():
+    """
+    What the rows in the manifest depend on besides the file itself. A manifest written
+    with other settings is discarded, so --incremental re-extracts every file.
+    """
+    profiles = vendor_profiles.get_index()
+    return {'extractor': EXTRACTOR_VERSION, 'ocr': OCR_PROFILE.cache_settings(), 'ocr_cells': OCR_CELLS,
+            'vendor_profiles': profiles.digest if VENDOR_PROFILES else None}
+
+def frame_to_rows(df):
+    """DataFrame -> JSON-safe list of dicts (for the manifest)."""
+    return json.loads(df.to_json(orient='records', force_ascii=False, date_format='iso'))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Extract quotation items into a summary Excel file.')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: number of CPU cores, 1 = no pool)')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'Only extract new or changed files; reuse rows recorded in {MANIFEST_FILE}')
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help='Write per-stage timings and counters to PATH (.prom: Prometheus text, otherwise JSON lines)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        with instrumentation.span('extract.run', workers=args.workers, incremental=args.incremental):
+            run(args)
+    finally:
+        instrumentation.report(args.metrics_out)
+
+def run(args):
+    """Extract INPUT_DIR into OUTPUT_FILE (see parse_args for the options)."""
+    # One sorted pass over INPUT_DIR and its sub folders (lock files and the master list are skipped),
+    # so the summary row order does not depend on the file system or on worker timing
+    entries = list(scan_files(INPUT_DIR))
+    filepaths = [e.path for e in entries]
+
+    if not args.incremental:
+        all_data = [df for df, _ in extract_files(filepaths, args.workers)]
+    else:
+        manifest = Manifest(MANIFEST_FILE, manifest_settings())
+        removed = manifest.prune(filepaths)
+
+        # Only new or modified files are extracted again
+        todo = []
+        for entry in entries:
+            changed, digest = manifest.check(entry.path, entry.stat)
+            if changed:
+                todo.append((entry.path, entry.stat, digest))
+
+        print(f"Incremental run: {len(todo)} new/changed, {len(filepaths) - len(todo)} unchanged, {len(removed)} removed.")
+        instrumentation.incr('files_unchanged', len(filepaths) - len(todo))
+        instrumentation.incr('files_removed', len(removed))
+        failed = []
+        for (filepath, stat, digest), (df, ok) in zip(todo, extract_files([t[0] for t in todo], args.workers)):
+            if ok:
+                manifest.update(filepath, frame_to_rows(df), stat, digest)
+            else:
+                # Not recorded: the next run tries again (an earlier entry, if any, is kept)
+                failed.append(filepath)
+        manifest.save()
+        if failed:
+            print(f"{len(failed)} file(s) failed and will be retried on the next run.")
+
+        if not todo and not removed and os.path.exists(OUTPUT_FILE):
+            print(f"{OUTPUT_FILE} is up to date.")
+            return
+
+        all_data = [pd.DataFrame(manifest.rows(fp), columns=OUTPUT_COLUMNS) for fp in filepaths]
     
+    all_data = [df for df in all_data if not df.empty]
     if all_data:
-        df_result = pd.DataFrame(all_data)
-        # Reorder columns
-        cols = ['ファイル名', '品名', '図番/型番', '数量', '単位', '単価', '金額']
-        # Add missing columns
-        for c in cols:
-            if c not in df_result.columns: df_result[c] = ''
-        
-        df_result = df_result[cols]
-        df_result.to_excel(OUTPUT_FILE, index=False)
-        print(f"Successfully saved to {OUTPUT_FILE}")
+        df_result = pd.concat(all_data, ignore_index=True)[OUTPUT_COLUMNS]
+    elif args.incremental and os.path.exists(OUTPUT_FILE):
+        # Rows of removed files must not stay in the summary
+        df_result = empty_items()
     else:
         print("No data extracted.")
+        return
+
+    with instrumentation.span('extract.write', rows=len(df_result)):
+        write_frame_streaming(df_result, OUTPUT_FILE)
+    print(f"Successfully saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,56 @@
+import argparse
+import sys
+import time
+
+from src.lib import ocr_service
+from src.lib.ocr_engine import DEFAULT_LANGUAGES
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Keep the OCR model loaded in a background worker, so other runs skip the model load. '
+                    'Runs use it only with EXCEL_WORK_OCR_SERVICE=1 set.')
+    parser.add_argument('--socket', default=None,
+                        help=f'Socket path / pipe name (default: {ocr_service.default_address()})')
+    parser.add_argument('--languages', default=','.join(DEFAULT_LANGUAGES),
+                        help='OCR languages, comma separated (clients must use the same)')
+    parser.add_argument('--stop', action='store_true', help='Stop the running worker')
+    parser.add_argument('--status', action='store_true', help='Show whether a worker is running')
+    parser.add_argument('--read', metavar='PDF',
+                        help='Print the text of a PDF read by the running worker, then exit')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    languages = tuple(l.strip() for l in args.languages.split(',') if l.strip())
+
+    if args.stop:
+        if ocr_service.stop(args.socket):
+            print("OCR service stopped.")
+        else:
+            print("No OCR service is running.")
+        return
+
+    if args.status or args.read:
+        client = ocr_service.connect(languages, args.socket)
+        if client is None:
+            print(f"No OCR service is running for languages {', '.join(languages)}.")
+            sys.exit(1)
+        if args.status:
+            print(f"OCR service running at {client.address} (languages: {', '.join(client.languages)})")
+        else:
+            start = time.perf_counter()
+            print(client.extract_text(args.read))
+            print(f"\n({time.perf_counter() - start:.2f}s)")
+        client.close()
+        return
+
+    try:
+        ocr_service.serve(languages, args.socket)
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import argparse
+import pandas as pd
+
+from src.lib.sheets_sync import SheetSync, InMemoryWorksheet, open_worksheet
+
+# Configuration
+SUMMARY_FILE = 'quotation_summary.xlsx'
+SHEET_NAME = '見積集計'  # Spreadsheet shared with the service account
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Push quotation_summary.xlsx to a Google Sheet (changed rows only).')
+    parser.add_argument('--file', default=SUMMARY_FILE, help=f'Summary Excel file (default: {SUMMARY_FILE})')
+    parser.add_argument('--sheet', default=SHEET_NAME, help=f'Spreadsheet name (default: {SHEET_NAME})')
+    parser.add_argument('--worksheet', type=int, default=0, help='Worksheet (tab) index, 0 = leftmost')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Sync into an in-memory sheet and print the API calls instead of contacting Google')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"エラー: {args.file} が見つかりません。先に extract_quotations を実行してください。")
+        return
+
+    df = pd.read_excel(args.file)
+    rows = df.astype(object).where(df.notna(), None).values.tolist()
+
+    if args.dry_run:
+        worksheet = InMemoryWorksheet()
+    else:
+        try:
+            worksheet = open_worksheet(args.sheet, args.worksheet)
+        except Exception as e:
+            print(f"エラー: スプレッドシート「{args.sheet}」を開けません: {e}")
+            print("サービスアカウントへの共有設定と、ファイル名を確認してください。")
+            return
+
+    result = SheetSync(worksheet).sync(list(df.columns), rows)
+    print(f"Synced {len(rows)} rows: {result['updated_rows']} updated, "
+          f"{result['appended_rows']} appended, {result['cleared_rows']} cleared.")
+    if args.dry_run:
+        print(f"API calls: {worksheet.calls}")
+
+if __name__ == "__main__":
+    main()
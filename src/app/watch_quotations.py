@@ -0,0 +1,255 @@
+import os
+import signal
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.app import extract_quotations as app
+from src.lib.manifest import Manifest
+from src.lib.file_discovery import scan_files
+from src.lib.workbook_stream import write_frame_streaming
+from src.lib import instrumentation
+from src.tools import update_list
+
+# Configuration
+POLL_INTERVAL = 5.0  # Seconds between scans of the input folder
+SETTLE_TIME = 2.0  # A file must keep its size and mtime this long before it is read (copy/save in progress)
+RETRY_INTERVAL = 300.0  # Seconds before a file whose extraction failed is tried again (sooner if it changes)
+
+def is_under(path, folder):
+    """True if path is inside folder (False for another drive on Windows)."""
+    try:
+        folder = os.path.realpath(folder)
+        return os.path.commonpath([os.path.realpath(path), folder]) == folder
+    except ValueError:
+        return False
+
+def can_open(path):
+    """False while another program still holds the file exclusively (Windows copy/save)."""
+    try:
+        with open(path, 'rb'):
+            return True
+    except OSError:
+        return False
+
+def _init_watch_worker():
+    # Ctrl+C reaches the whole process group; the parent stops the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    app._init_worker()
+
+def _watch_task(filepath):
+    """Pool task: summary rows, the ok flag and metrics (see extract_quotations.process_file)."""
+    instrumentation.METRICS.reset()
+    df, ok = app.process_file(filepath, app._worker_reader)
+    return df, ok, instrumentation.METRICS.snapshot()
+
+
+class QuotationWatcher:
+    def __init__(self, input_dir=app.INPUT_DIR, workers=1, settle=SETTLE_TIME, master_file=None, master_dir=None):
+        """
+        Keeps the summary (and the master list) up to date with the files in input_dir.
+        New or changed files (see Manifest, shared with extract_quotations --incremental) are
+        extracted once they have settled; the summary is rewritten from the manifest rows and
+        their items are upserted into the master list. Each file is extracted once: the master
+        list items are taken from its summary rows. A file whose extraction fails is not recorded
+        and is tried again after RETRY_INTERVAL, or as soon as it changes.
+        :param workers: Extraction processes (1 = in this process). The pool is kept for the
+                        whole run, so each worker loads its OCR model only once.
+        :param master_file: Master list to upsert into (None = summary only).
+        :param master_dir: Only files under this folder feed the master list.
+        """
+        self.input_dir = input_dir
+        self.workers = max(1, workers)
+        self.settle = settle
+        self.master_file = master_file
+        self.master_dir = master_dir
+        self.manifest = Manifest(app.MANIFEST_FILE, app.manifest_settings())
+        self.seen = {}  # path -> ((size, mtime), time first seen with that stat)
+        self.running = {}  # path -> (future or None, stat, digest)
+        self.failed = {}  # path -> ((size, mtime), time of the failure)
+        self.master_items = []  # extracted but not yet in the master list (e.g. the file was open in Excel)
+        self.summary_dirty = False
+        self.executor = None
+        self.reader = None
+
+    def start(self):
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_watch_worker)
+        else:
+            self.reader = app._new_reader()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        self.manifest.save()
+
+    def scan(self, now=None):
+        """
+        One pass over the input folder.
+        :return: (paths of all current files, list of (path, stat, digest) ready to extract)
+        """
+        now = time.time() if now is None else now
+        entries = list(scan_files(self.input_dir))
+        ready = []
+        for entry in entries:
+            path = entry.path
+            if path in self.running:
+                continue
+            # Debounce: wait until the file stops growing/changing
+            stat_key = (entry.stat.st_size, entry.stat.st_mtime)
+            last = self.seen.get(path)
+            if last is None or last[0] != stat_key:
+                self.seen[path] = (stat_key, now)
+                if self.settle > 0:
+                    continue
+            elif now - last[1] < self.settle:
+                continue
+            failed = self.failed.get(path)
+            if failed is not None and failed[0] == stat_key and now - failed[1] < RETRY_INTERVAL:
+                continue
+
+            changed, digest = self.manifest.check(path, entry.stat)
+            if changed and can_open(path):
+                ready.append((path, entry.stat, digest))
+
+        paths = [e.path for e in entries]
+        for path in set(self.seen) - set(paths):
+            del self.seen[path]
+            self.failed.pop(path, None)
+        if self.manifest.prune(paths):
+            self.summary_dirty = True
+        return paths, ready
+
+    def submit(self, ready):
+        """Queue files for extraction (run right away without a pool)."""
+        for path, stat, digest in ready:
+            if self.executor is not None:
+                self.running[path] = (self.executor.submit(_watch_task, path), stat, digest)
+            else:
+                df, ok = app.process_file(path, self.reader)
+                self._finish(path, stat, digest, df, ok)
+
+    def collect(self):
+        """Record the results of finished pool tasks. Returns the number of files finished."""
+        done = [path for path, (future, _, _) in self.running.items() if future.done()]
+        for path in done:
+            future, stat, digest = self.running.pop(path)
+            try:
+                df, ok, metrics = future.result()
+            except Exception as e:
+                # E.g. the worker process died
+                print(f"Error processing {path}: {e}")
+                instrumentation.incr('errors', kind='watch')
+                df, ok = None, False
+            else:
+                instrumentation.METRICS.merge(metrics)
+            self._finish(path, stat, digest, df, ok)
+        return len(done)
+
+    def _finish(self, path, stat, digest, df, ok):
+        if not ok:
+            # Not recorded, so the manifest keeps the earlier rows (if any) and a restart retries it
+            self.failed[path] = ((stat.st_size, stat.st_mtime), time.time())
+            print(f"{os.path.basename(path)} will be tried again in {RETRY_INTERVAL:g}s or when it changes.")
+            return
+        self.failed.pop(path, None)
+        self.manifest.update(path, app.frame_to_rows(df), stat, digest)
+        if self.master_file and (self.master_dir is None or is_under(path, self.master_dir)):
+            self.master_items.extend(update_list.items_from_summary(df, path))
+        self.summary_dirty = True
+
+    def write_outputs(self, paths):
+        """Rewrite the summary from the manifest and upsert the new items into the master list."""
+        if self.summary_dirty:
+            self.manifest.save()
+            frames = [pd.DataFrame(self.manifest.rows(p), columns=app.OUTPUT_COLUMNS) for p in paths]
+            frames = [df for df in frames if not df.empty]
+            df_result = pd.concat(frames, ignore_index=True)[app.OUTPUT_COLUMNS] if frames else app.empty_items()
+            try:
+                with instrumentation.span('extract.write', rows=len(df_result)):
+                    write_frame_streaming(df_result, app.OUTPUT_FILE)
+                self.summary_dirty = False
+                print(f"{app.OUTPUT_FILE}: {len(df_result)} rows")
+            except OSError as e:
+                # Typically open in Excel; written on the next cycle
+                print(f"Could not write {app.OUTPUT_FILE}: {e}")
+
+        if self.master_items:
+            # Upsert: a changed quotation updates its prices instead of adding the rows again
+            try:
+                update_list.update_excel(self.master_items, upsert=True, target_file=self.master_file)
+                self.master_items = []
+            except OSError as e:
+                print(f"Could not update {os.path.basename(self.master_file)}: {e}")
+
+    def cycle(self):
+        """Scan, queue and collect once. Returns True if any file was extracted."""
+        paths, ready = self.scan()
+        if ready:
+            print(f"{len(ready)} new/changed file(s): " + ", ".join(os.path.basename(p) for p, _, _ in ready))
+        self.submit(ready)
+        finished = self.collect() if self.executor is not None else len(ready)
+        self.write_outputs(paths)
+        return finished > 0
+
+    def busy(self):
+        return bool(self.running)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Watch the quotation folder and keep the summary and the master list up to date.')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Extraction worker processes (default: 1 = in this process)')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help=f'Seconds between folder scans (default: {POLL_INTERVAL})')
+    parser.add_argument('--settle', type=float, default=SETTLE_TIME,
+                        help=f'Seconds a file must stay unchanged before it is read (default: {SETTLE_TIME})')
+    parser.add_argument('--master', default=update_list.TARGET_FILE,
+                        help='Master list to upsert extracted items into')
+    parser.add_argument('--master-dir', default=update_list.extractor.TARGET_DIR,
+                        help='Only quotations in this folder go into the master list')
+    parser.add_argument('--no-master', action='store_true', help='Only update the summary')
+    parser.add_argument('--once', action='store_true',
+                        help='Process the files that are ready now, then exit')
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help='Write per-stage timings and counters of each cycle to PATH (.prom: Prometheus text, otherwise JSON lines)')
+    return parser.parse_args(argv)
+
+def _stop_on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Stopped as a service (systemd, kill): same clean shutdown as Ctrl+C
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    master = None
+    if not args.no_master:
+        if os.path.exists(args.master):
+            master = args.master
+        else:
+            print(f"Master list not found: {args.master}. Only {app.OUTPUT_FILE} is updated.")
+
+    watcher = QuotationWatcher(app.INPUT_DIR, args.workers, 0 if args.once else args.settle,
+                               master, args.master_dir)
+    watcher.start()
+    print(f"Watching {app.INPUT_DIR} every {args.interval:g}s (Ctrl+C to stop)...")
+    try:
+        while True:
+            if watcher.cycle():
+                instrumentation.report(args.metrics_out)
+                # Each cycle reports only its own work
+                instrumentation.METRICS.reset()
+            if args.once and not watcher.busy():
+                break
+            time.sleep(1.0 if args.once else args.interval)
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        watcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from src.lib import instrumentation
+from src.lib import ocr_render
+from src.lib.ocr_render import DEFAULT_PROFILE, render_page, mean_confidence
+
+# Recognition-only OCR for ruled tables: the cells come from the ruling lines, the text lines
+# inside a cell from its ink profile, and only the recogniser runs (no CRAFT text detector).
+
+# A page needs at least this many table cells to be read cell by cell
+MIN_CELLS = 6
+# Share of the page's ink (ruling lines excluded) that must lie inside cells; forms with much
+# text outside the table (addresses, notes) are read with the detector instead
+MIN_INK_COVERAGE = 0.7
+# Cells/lines smaller than this (PDF points) are gaps between double rules or noise
+MIN_CELL_SIZE = 5
+MIN_LINE_HEIGHT = 3
+# Ink rows closer than this (PDF points) are one text line (accents, 'ー', split strokes)
+LINE_GAP = 1.5
+# A horizontal gap wider than this many line heights splits a line into two boxes (like the detector)
+WORD_GAP = 1.5
+# Pixels trimmed from each cell edge so the ruling line itself is not read
+CELL_INSET = 3
+# Pixels added around each text line for the recogniser
+BOX_PAD = 2
+
+def _to_gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+def _line_masks(gray):
+    """(ink, ruling lines) as binary masks: dark pixels, and the long straight runs among them."""
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    h, w = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 30, 10), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 40, 10))))
+    lines = cv2.dilate(cv2.bitwise_or(horizontal, vertical), np.ones((3, 3), np.uint8))
+    return ink, lines
+
+def cells_from_lines(lines, dpi, min_size=MIN_CELL_SIZE):
+    """
+    Table cells as the regions enclosed by ruling lines (OpenCV, scanned pages).
+    :param lines: Ruling line mask from _line_masks().
+    :return: List of (x0, y0, x1, y1) in pixels.
+    """
+    h, w = lines.shape
+    # The ROI crop may cut through the outer columns; the image border closes those cells
+    closed = lines.copy()
+    cv2.rectangle(closed, (0, 0), (w - 1, h - 1), 255, 1)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(cv2.bitwise_not(closed), connectivity=4)
+    min_px = min_size * dpi / 72.0
+    cells = []
+    for x, y, bw, bh, _ in stats[1:count] if count > 1 else []:
+        # Very large regions are the page around the table, not a cell
+        if bw < min_px or bh < min_px or bw * bh > 0.5 * w * h:
+            continue
+        cells.append((int(x), int(y), int(x + bw), int(y + bh)))
+    return cells
+
+def cells_from_rules(page, dpi):
+    """
+    Table cells from the page's vector lines/rects (pdfplumber find_tables).
+    :return: List of (x0, y0, x1, y1) in pixels of the page rendered at dpi.
+    """
+    if not page.lines and not page.rects:
+        return []
+    scale = dpi / 72.0
+    px0, ptop = page.bbox[0], page.bbox[1]
+    return [(int((x0 - px0) * scale), int((top - ptop) * scale), int((x1 - px0) * scale), int((bottom - ptop) * scale))
+            for table in page.find_tables() for x0, top, x1, bottom in table.cells]
+
+def line_boxes(ink, cells, dpi, inset=CELL_INSET, pad=BOX_PAD):
+    """
+    Text line boxes inside the cells, from the rows that contain ink (a cell with a
+    wrapped product name gives one box per line; an empty cell gives none). A line is
+    split where the ink has a gap wider than WORD_GAP line heights.
+    :param ink: Ink mask without the ruling lines.
+    :return: List of [x_min, x_max, y_min, y_max] (EasyOCR horizontal_list format).
+    """
+    gap = LINE_GAP * dpi / 72.0
+    min_height = MIN_LINE_HEIGHT * dpi / 72.0
+    h, w = ink.shape
+    boxes = []
+    for x0, y0, x1, y1 in cells:
+        cx0, cy0, cx1, cy1 = x0 + inset, y0 + inset, x1 - inset, y1 - inset
+        if cx1 <= cx0 or cy1 <= cy0:
+            continue
+        cell = ink[cy0:cy1, cx0:cx1]
+        rows = np.flatnonzero(cell.any(axis=1))
+        if len(rows) == 0:
+            continue
+        # Split the inked rows into runs wherever the gap is wider than LINE_GAP
+        breaks = np.flatnonzero(np.diff(rows) > gap)
+        for start, end in zip(np.r_[rows[0], rows[breaks + 1]], np.r_[rows[breaks], rows[-1]]):
+            if end - start + 1 < min_height:
+                continue
+            cols = np.flatnonzero(cell[start:end + 1].any(axis=0))
+            splits = np.flatnonzero(np.diff(cols) > WORD_GAP * (end - start + 1))
+            for left, right in zip(np.r_[cols[0], cols[splits + 1]], np.r_[cols[splits], cols[-1]]):
+                boxes.append([max(0, cx0 + int(left) - pad), min(w, cx0 + int(right) + 1 + pad),
+                              max(0, cy0 + int(start) - pad), min(h, cy0 + int(end) + 1 + pad)])
+    return boxes
+
+def find_boxes(page, img, dpi, min_cells=MIN_CELLS, min_coverage=MIN_INK_COVERAGE):
+    """
+    Text line boxes of a rendered page when its table grid can be recovered, else None.
+    :return: (boxes as in line_boxes(), cells in pixels) or None.
+    Cells come from line detection on the image (what the recogniser actually sees; the
+    vector rules of a scanned form need not line up with the scan), else from the PDF's
+    vector rules (hairlines can vanish in the render).
+    """
+    if cv2 is None:
+        return None
+    gray = _to_gray(img)
+    ink, lines = _line_masks(gray)
+    ink = cv2.bitwise_and(ink, cv2.bitwise_not(lines))
+
+    cells = cells_from_lines(lines, dpi)
+    if len(cells) < min_cells:
+        cells = cells_from_rules(page, dpi)
+    if len(cells) < min_cells:
+        return None
+
+    # Ink outside every cell is text the cell pass would silently drop
+    inside = np.zeros_like(ink)
+    for x0, y0, x1, y1 in cells:
+        inside[max(0, y0):y1, max(0, x0):x1] = 255
+    total = cv2.countNonZero(ink)
+    if total and cv2.countNonZero(cv2.bitwise_and(ink, inside)) < min_coverage * total:
+        return None
+    return line_boxes(ink, cells, dpi), cells
+
+def cell_rules(cells, page, dpi):
+    """
+    Left/right cell edges as vertical rules (x, top, bottom) in page coordinates, like
+    hybrid_pdf.vertical_rules(), so the table grid of a scanned page follows its ruling.
+    """
+    scale = 72.0 / dpi
+    px0, ptop = page.bbox[0], page.bbox[1]
+    rules = []
+    for x0, y0, x1, y1 in cells:
+        top, bottom = round(ptop + y0 * scale, 1), round(ptop + y1 * scale, 1)
+        rules.append((round(px0 + x0 * scale, 1), top, bottom))
+        rules.append((round(px0 + x1 * scale, 1), top, bottom))
+    return rules
+
+def recognize_boxes(reader, img, boxes, batch_size=1):
+    """
+    Recogniser only, on the given line boxes (EasyOCR Reader.recognize).
+    :param batch_size: Recogniser batch size (see ocr_render.readtext_many).
+    :return: readtext(detail=1)-style results in reading order, empty reads dropped.
+    """
+    if not boxes:
+        return []
+    with instrumentation.span('ocr.recognize', mode='cells', boxes=len(boxes)):
+        results = reader.recognize(_to_gray(img), horizontal_list=boxes, free_list=[], detail=1, batch_size=batch_size)
+    results = [r for r in results if str(r[1]).strip()]
+    return sorted(results, key=lambda r: (r[0][0][1], r[0][0][0]))
+
+def _read_cells(reader, page, dpi, profile, batch_size):
+    with instrumentation.span('ocr.render', dpi=dpi):
+        img = render_page(page, dpi, profile)
+    with instrumentation.span('ocr.cells', dpi=dpi):
+        found = find_boxes(page, img, dpi)
+    if found is None:
+        return None
+    boxes, cells = found
+    return recognize_boxes(reader, img, boxes, batch_size), cell_rules(cells, page, dpi)
+
+def ocr_pages(reader, pages, profile=DEFAULT_PROFILE, batch_size=1, rules=None):
+    """
+    Like ocr_render.ocr_pages(), but pages whose table grid can be recovered are read cell
+    by cell with the recogniser only. The other pages (and readers without recognize())
+    go through the full detector + recogniser, batched.
+    In adaptive mode a cell-read page with low mean confidence is read again at high_dpi.
+    :param rules: Optional list, filled with the vertical rules of each page (see cell_rules();
+                  empty for pages read with the detector).
+    :return: List of (readtext(detail=1) results, DPI of the returned results), in page order.
+    """
+    outputs = [None] * len(pages)
+    page_rules = [[] for _ in pages]
+    if cv2 is not None and hasattr(reader, 'recognize'):
+        for i, page in enumerate(pages):
+            read = _read_cells(reader, page, profile.dpi, profile, batch_size)
+            if read is None:
+                continue
+            (results, page_rules[i]), dpi = read, profile.dpi
+            if profile.adaptive and profile.high_dpi > dpi and mean_confidence(results) < profile.min_confidence:
+                instrumentation.incr('ocr_rerenders')
+                retry = _read_cells(reader, page, profile.high_dpi, profile, batch_size)
+                if retry is not None:
+                    (results, page_rules[i]), dpi = retry, profile.high_dpi
+            outputs[i] = (results, dpi)
+            instrumentation.incr('ocr_regions', mode='cells')
+    if rules is not None:
+        rules.extend(page_rules)
+
+    rest = [i for i, out in enumerate(outputs) if out is None]
+    if rest:
+        instrumentation.incr('ocr_regions', len(rest), mode='full')
+        for i, out in zip(rest, ocr_render.ocr_pages(reader, [pages[i] for i in rest], profile, batch_size)):
+            outputs[i] = out
+    return outputs
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import openpyxl
+
+def read_sheet_values(file_path):
+    """
+    Read the cell values of the first sheet into a DataFrame without a header
+    (same shape as pd.read_excel(file_path, header=None)).
+    .xlsx files are streamed with a read-only openpyxl workbook, so only the
+    first sheet's cell values are parsed (no styles, no other sheets).
+    :param file_path: Path to the Excel file.
+    """
+    if not file_path.lower().endswith(('.xlsx', '.xlsm')):
+        # Old .xls format is not supported by openpyxl
+        return pd.read_excel(file_path, header=None)
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        # Do not trust the stored <dimension> (often a stale "A1"); scan the actual rows as pandas does
+        ws.reset_dimensions()
+        # Empty strings are treated as missing, as pandas does
+        rows = [[None if v == '' else v for v in row] for row in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+    # Drop trailing empty rows like pandas does
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    # Drop trailing empty columns as well
+    non_empty_cols = np.flatnonzero(df.notna().any(axis=0).to_numpy())
+    df = df.iloc[:, :non_empty_cols[-1] + 1] if len(non_empty_cols) else df.iloc[:, :0]
+    df = df.where(df.notna(), np.nan)
+    return df.infer_objects()
+
+def frame_with_header(raw, header_idx):
+    """
+    Re-slice a header-less frame so that row `header_idx` becomes the column names
+    (same result as pd.read_excel(file_path, header=header_idx), without reading the file again).
+    :param raw: DataFrame from read_sheet_values().
+    :param header_idx: Index of the header row in `raw`.
+    """
+    pos = raw.index.get_loc(header_idx)
+    columns = []
+    seen = {}
+    for i, val in enumerate(raw.iloc[pos].tolist()):
+        name = f"Unnamed: {i}" if pd.isna(val) else val
+        # Mangle duplicate names the same way pandas does ('単価', '単価.1', ...)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+
+    df = raw.iloc[pos + 1:].copy()
+    df.columns = columns
+    return df.reset_index(drop=True).infer_objects()
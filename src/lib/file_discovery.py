@@ -0,0 +1,50 @@
+import fnmatch
+import os
+from collections import namedtuple
+
+# path: usable with open(); relpath: relative to the scanned root; stat: os.stat_result
+FileEntry = namedtuple('FileEntry', ['path', 'relpath', 'name', 'stat'])
+
+QUOTATION_PATTERNS = ('*.xlsx', '*.xls', '*.pdf')
+# Excel lock files and the master list that update_list writes to
+DEFAULT_EXCLUDES = ('~$*', '加工品リスト.xlsx')
+
+def _matches(name, patterns):
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, p.lower()) for p in patterns)
+
+def scan_files(root, include=QUOTATION_PATTERNS, exclude=DEFAULT_EXCLUDES, recursive=True):
+    """
+    Walk a folder tree with os.scandir in one pass and yield matching files.
+    Patterns are glob patterns matched case-insensitively against the file name
+    (exclude patterns are also applied to sub folder names).
+    Files are yielded in sorted order, folder by folder.
+    :param root: Folder to scan.
+    :param include: Glob patterns of files to yield.
+    :param exclude: Glob patterns of files/folders to skip.
+    :param recursive: Descend into sub folders.
+    :return: Generator of FileEntry.
+    """
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"[scan_files] Cannot read {folder}: {e}")
+            continue
+
+        sub_folders = []
+        for entry in entries:
+            if exclude and _matches(entry.name, exclude):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    sub_folders.append(entry.path)
+            elif entry.is_file() and _matches(entry.name, include):
+                # DirEntry caches the stat result, so callers get it for free
+                yield FileEntry(entry.path, os.path.relpath(entry.path, root), entry.name, entry.stat())
+
+        # Reversed so sub folders are visited in sorted order
+        stack.extend(reversed(sub_folders))
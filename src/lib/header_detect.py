@@ -0,0 +1,70 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Headers sit near the top of a quotation; rows below this are never scanned
+HEADER_SCAN_ROWS = 100
+
+def compile_keyword_patterns(keywords, literal=True):
+    """
+    Compile {category: [keyword, ...]} into one alternation regex per category.
+    :param keywords: Dict of category -> list of keywords (or regex fragments).
+    :param literal: Escape keywords (True) or use them as regex fragments (False).
+    """
+    compiled = {}
+    for key, words in keywords.items():
+        parts = [re.escape(w) if literal else w for w in words]
+        compiled[key] = re.compile('|'.join(parts))
+    return compiled
+
+def keyword_hits(df, patterns, max_rows=HEADER_SCAN_ROWS):
+    """
+    Match every category pattern against the top rows of a header-less frame.
+    Cells are stringified once and each category is matched with a single
+    vectorized str.contains over all cells.
+    :return: Dict of category -> bool array of shape (rows, cols).
+    """
+    values = df.head(max_rows).to_numpy(dtype=object)
+    shape = values.shape
+    text = np.where(pd.isna(values), '', values.astype(str)).ravel()
+    cells = pd.Series(text, dtype=object)
+
+    hits = {}
+    for key, pattern in patterns.items():
+        hits[key] = cells.str.contains(pattern, regex=True).to_numpy(dtype=bool).reshape(shape)
+    return hits
+
+def find_header_row(df, patterns, required, max_rows=HEADER_SCAN_ROWS):
+    """
+    Return the index label of the first row that contains a keyword of every
+    required category, or None.
+    """
+    if df.empty:
+        return None
+    hits = keyword_hits(df, {k: patterns[k] for k in required}, max_rows)
+    mask = np.logical_and.reduce([hits[k].any(axis=1) for k in required])
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return None
+    return df.index[positions[0]]
+
+def best_header_row(df, patterns, min_score=2, max_rows=HEADER_SCAN_ROWS):
+    """
+    Score rows by the number of distinct categories they contain and return the best one.
+    :return: (index label, score, {category: column position}) or (None, 0, {}).
+    """
+    if df.empty:
+        return None, 0, {}
+    hits = keyword_hits(df, patterns, max_rows)
+    row_hits = {k: h.any(axis=1) for k, h in hits.items()}
+    scores = np.sum(list(row_hits.values()), axis=0)
+
+    pos = int(np.argmax(scores))  # First row with the highest score
+    score = int(scores[pos])
+    if score < min_score:
+        return None, 0, {}
+
+    # Column of the first matching cell per category, ordered left to right
+    found = [(int(np.argmax(hits[k][pos])), k) for k in patterns if row_hits[k][pos]]
+    col_map = {k: col for col, k in sorted(found, key=lambda x: x[0])}
+    return df.index[pos], score, col_map
@@ -0,0 +1,144 @@
+from collections import namedtuple
+
+from src.lib import ocr_roi
+
+# One positioned piece of text, in PDF points (pdfplumber page coordinates, origin top-left).
+# source is 'text' (PDF text layer, conf 1.0) or 'ocr' (EasyOCR box).
+Token = namedtuple('Token', ['text', 'x0', 'top', 'x1', 'bottom', 'conf', 'source'])
+
+# Images smaller than this share of the page are logos/stamps, not content worth OCR
+MIN_IMAGE_AREA_RATIO = 0.05
+# An image with fewer text-layer words over it than this lacks text (scan, pasted screenshot)
+MIN_WORDS_IN_IMAGE = 3
+# Regions at least this large are treated as a scanned page: OCR only its table area (ocr_roi)
+FULL_PAGE_RATIO = 0.5
+# Words closer than this many character heights are one phrase (like an EasyOCR box)
+PHRASE_GAP = 1.0
+# Shorter vertical edges are glyph strokes or underlines, not table rules (PDF points)
+MIN_RULE_LENGTH = 10
+
+def text_tokens(page):
+    """Words of the PDF text layer as Tokens."""
+    return [Token(w['text'], w['x0'], w['top'], w['x1'], w['bottom'], 1.0, 'text')
+            for w in page.extract_words()]
+
+def vertical_rules(page, min_length=MIN_RULE_LENGTH):
+    """Vertical ruling lines of the page (table column separators) as (x, top, bottom)."""
+    return [(round(e['x0'], 1), round(e['top'], 1), round(e['bottom'], 1))
+            for e in page.edges if e['orientation'] == 'v' and e['bottom'] - e['top'] >= min_length]
+
+def _center_inside(token, bbox):
+    cx = (token.x0 + token.x1) / 2
+    cy = (token.top + token.bottom) / 2
+    return bbox[0] <= cx <= bbox[2] and bbox[1] <= cy <= bbox[3]
+
+def _area(bbox):
+    return max(0.0, bbox[2] - bbox[0]) * max(0.0, bbox[3] - bbox[1])
+
+def untexted_regions(page, tokens, min_area_ratio=MIN_IMAGE_AREA_RATIO, min_words=MIN_WORDS_IN_IMAGE):
+    """
+    Parts of the page that need OCR.
+    A page without any text-layer word is OCR'd whole (scans, outlined fonts); otherwise
+    only the large images that have (almost) no words over them.
+    :param tokens: text_tokens() of the page.
+    :return: List of bboxes (x0, top, x1, bottom) in page coordinates, largest first.
+    """
+    if not tokens:
+        return [tuple(page.bbox)]
+
+    px0, ptop, px1, pbottom = page.bbox
+    min_area = min_area_ratio * _area(page.bbox)
+    candidates = []
+    for im in page.images:
+        bbox = (max(px0, im['x0']), max(ptop, im['top']), min(px1, im['x1']), min(pbottom, im['bottom']))
+        if _area(bbox) < min_area:
+            continue
+        if sum(1 for t in tokens if _center_inside(t, bbox)) >= min_words:
+            continue
+        candidates.append(bbox)
+
+    # Overlapping images (e.g. a scan drawn twice) are read once, via the largest one
+    regions = []
+    for bbox in sorted(candidates, key=_area, reverse=True):
+        if any(r[0] <= bbox[0] and r[1] <= bbox[1] and r[2] >= bbox[2] and r[3] >= bbox[3] for r in regions):
+            continue
+        regions.append(bbox)
+    return regions
+
+def region_crops(page, regions, filename=None, roi=True, roi_overrides=None):
+    """
+    Cropped pages to OCR for the given regions.
+    Page-sized regions are narrowed to the line-item table (see ocr_roi.crop_to_table).
+    """
+    crops = []
+    page_area = _area(page.bbox)
+    for bbox in regions:
+        crop = page if tuple(bbox) == tuple(page.bbox) else page.crop(bbox)
+        if roi and _area(bbox) >= FULL_PAGE_RATIO * page_area:
+            crop = ocr_roi.crop_to_table(crop, filename, roi_overrides)
+        crops.append(crop)
+    return crops
+
+def ocr_tokens(results, crop, dpi):
+    """
+    readtext(detail=1) results of a rendered (cropped) page -> Tokens in page coordinates.
+    Pixels are scaled by 72/dpi and shifted by the crop's top-left corner.
+    """
+    scale = 72.0 / dpi
+    x_off, y_off = crop.bbox[0], crop.bbox[1]
+    tokens = []
+    for box, text, conf in results:
+        xs = [p[0] for p in box]
+        ys = [p[1] for p in box]
+        tokens.append(Token(text, x_off + min(xs) * scale, y_off + min(ys) * scale,
+                            x_off + max(xs) * scale, y_off + max(ys) * scale, float(conf), 'ocr'))
+    return tokens
+
+def group_lines(tokens):
+    """
+    Tokens -> lines in reading order (top to bottom, each line left to right).
+    A token belongs to the current line when its vertical centre falls inside the line's band.
+    """
+    lines = []
+    band = None
+    for t in sorted(tokens, key=lambda t: (t.top, t.x0)):
+        cy = (t.top + t.bottom) / 2
+        if band is not None and band[0] <= cy <= band[1]:
+            lines[-1].append(t)
+            band = (min(band[0], t.top), max(band[1], t.bottom))
+        else:
+            lines.append([t])
+            band = (t.top, t.bottom)
+    return [sorted(line, key=lambda t: t.x0) for line in lines]
+
+def phrases(tokens, gap=PHRASE_GAP):
+    """
+    Join text-layer words that are close together on a line into one Token, so a
+    text page gives pieces like EasyOCR's boxes (one per cell/column) instead of words.
+    OCR tokens are kept as they are.
+    """
+    out = []
+    for line in group_lines(tokens):
+        current = None
+        for t in line:
+            if t.source != 'text':
+                if current:
+                    out.append(current)
+                    current = None
+                out.append(t)
+                continue
+            height = max(t.bottom - t.top, 1.0)
+            if current is not None and t.x0 - current.x1 <= gap * height:
+                current = current._replace(text=f"{current.text} {t.text}", x1=max(current.x1, t.x1),
+                                           top=min(current.top, t.top), bottom=max(current.bottom, t.bottom))
+            else:
+                if current:
+                    out.append(current)
+                current = t
+        if current:
+            out.append(current)
+    return out
+
+def tokens_to_text(tokens):
+    """Plain text: one line per visual line, tokens separated by spaces."""
+    return "\n".join(" ".join(t.text for t in line) for line in group_lines(tokens))
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+METRIC_PREFIX = 'excel_work'
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Timing spans and counters for one run (or one pool worker).
+        Spans are kept individually (for JSON lines); counters are summed per name + labels.
+        """
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.spans = []
+        self.counters = defaultdict(float)  # (name, ((label, value), ...)) -> value
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Time a block of code.
+        :param name: Stage name, e.g. 'pdf.page' or 'ocr.recognize'.
+        :param attrs: Extra fields for the record (file, page, method, ...). They can be
+                      filled in inside the block through the yielded dict.
+        """
+        record = {'name': name, 'start': time.time()}
+        record.update(attrs)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['duration_s'] = time.perf_counter() - start
+            with self._lock:
+                self.spans.append(record)
+
+    def incr(self, name, value=1, **labels):
+        """Add value to a counter (e.g. incr('pdf_pages', method='ocr'))."""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def counter(self, name, **labels):
+        """Current value of a counter (0 if never incremented)."""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        return self.counters.get(key, 0)
+
+    def snapshot(self):
+        """Picklable/JSON-safe copy, e.g. to return from a pool worker."""
+        with self._lock:
+            return {
+                'spans': [dict(s) for s in self.spans],
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+            }
+
+    def merge(self, snapshot):
+        """Add the spans and counters of a snapshot() (from another process) to this run."""
+        with self._lock:
+            self.spans.extend(snapshot['spans'])
+            for name, labels, value in snapshot['counters']:
+                self.counters[(name, tuple(tuple(l) for l in labels))] += value
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self.counters = defaultdict(float)
+
+    def summary(self):
+        """Total seconds and count per span name, slowest first."""
+        totals = defaultdict(lambda: [0.0, 0])
+        for s in self.spans:
+            totals[s['name']][0] += s['duration_s']
+            totals[s['name']][1] += 1
+        return sorted(((name, t, n) for name, (t, n) in totals.items()), key=lambda x: -x[1])
+
+    def write(self, path):
+        """Export to path: Prometheus text for '.prom', JSON lines otherwise."""
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_jsonl(path)
+
+    def write_jsonl(self, path):
+        """Append one JSON line per span and per counter, tagged with the run start time."""
+        with open(path, 'a', encoding='utf-8') as f:
+            for s in self.spans:
+                f.write(json.dumps(dict(type='span', run=self.started, **s), ensure_ascii=False, default=str) + '\n')
+            for (name, labels), value in self.counters.items():
+                line = {'type': 'counter', 'run': self.started, 'name': name, 'labels': dict(labels), 'value': value}
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+    def write_prometheus(self, path):
+        """
+        Write the Prometheus text format (e.g. for node_exporter's textfile collector).
+        Counters become <prefix>_<name>_total; spans are summed per name into
+        <prefix>_span_seconds_sum / _count, since file and page would explode the label set.
+        The file is replaced atomically so a scraper never reads half of it.
+        """
+        lines = []
+        by_name = defaultdict(list)
+        for (name, labels), value in sorted(self.counters.items()):
+            by_name[name].append((labels, value))
+        for name, series in by_name.items():
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in series:
+                lines.append(f"{metric}{_prom_labels(labels)} {_prom_value(value)}")
+
+        summary = self.summary()
+        if summary:
+            metric = f"{METRIC_PREFIX}_span_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for name, total, count in sorted(summary):
+                labels = _prom_labels((('span', name),))
+                lines.append(f"{metric}_sum{labels} {total:.6f}")
+                lines.append(f"{metric}_count{labels} {count}")
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ''
+    def escape(v):
+        return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels) + '}'
+
+def _prom_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Process-wide metrics, shared by the readers/extractors in this process
+METRICS = Metrics()
+
+def span(name, **attrs):
+    """METRICS.span() shortcut."""
+    return METRICS.span(name, **attrs)
+
+def incr(name, value=1, **labels):
+    """METRICS.incr() shortcut."""
+    METRICS.incr(name, value, **labels)
+
+def report(path=None, metrics=None):
+    """
+    Print the time per stage and the counters, and export them to path (if given).
+    :param path: '.prom' for Prometheus text, anything else for JSON lines.
+    """
+    metrics = metrics or METRICS
+    summary = metrics.summary()
+    if summary:
+        print("Time per stage: " + ", ".join(f"{name} {total:.2f}s ({count})" for name, total, count in summary))
+    if metrics.counters:
+        def label(labels):
+            return '{' + ','.join(f"{k}={v}" for k, v in labels) + '}' if labels else ''
+        print("Counters: " + ", ".join(f"{name}{label(labels)}={_prom_value(value)}"
+                                       for (name, labels), value in sorted(metrics.counters.items())))
+    if path:
+        metrics.write(path)
+        print(f"Metrics written to {path}")
@@ -0,0 +1,81 @@
+import json
+import os
+
+from src.lib.ocr_cache import file_digest
+
+MANIFEST_VERSION = 1
+
+class Manifest:
+    def __init__(self, path, settings=None):
+        """
+        Record of already processed files for incremental runs.
+        Each entry holds the file's size, mtime, content hash and extracted rows.
+        :param path: JSON file where the manifest is stored.
+        :param settings: JSON-serialisable extraction settings (extractor version, profiles, ...).
+                         Rows recorded with different settings are not reused.
+        """
+        self.path = path
+        # Through JSON once, so a tuple compares equal to the list read back from the file
+        self.settings = json.loads(json.dumps(settings, sort_keys=True, ensure_ascii=False))
+        self.files = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != MANIFEST_VERSION:
+                    pass
+                elif data.get('settings') != self.settings:
+                    print(f"[Manifest] Extraction settings changed since {path} was written. Extracting all files again.")
+                else:
+                    self.files = data.get('files', {})
+            except (OSError, ValueError):
+                print(f"[Manifest] Could not read {path}. Starting from scratch.")
+
+    def check(self, path, stat=None):
+        """
+        Check whether a file changed since it was recorded.
+        Size and mtime are compared first; the content is hashed only when they differ.
+        :return: (changed, digest). digest is None when it was not needed.
+        """
+        stat = stat or os.stat(path)
+        entry = self.files.get(path)
+        if entry is None:
+            return True, None
+        if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return False, None
+
+        digest = file_digest(path)
+        if digest == entry['sha256']:
+            # Touched but not modified (e.g. copied back): remember the new stat
+            entry['size'] = stat.st_size
+            entry['mtime'] = stat.st_mtime
+            return False, digest
+        return True, digest
+
+    def update(self, path, rows, stat=None, digest=None):
+        """Record the extracted rows (list of dicts) for a file."""
+        stat = stat or os.stat(path)
+        self.files[path] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': digest or file_digest(path),
+            'rows': rows,
+        }
+
+    def rows(self, path):
+        entry = self.files.get(path)
+        return entry['rows'] if entry else []
+
+    def prune(self, existing_paths):
+        """Drop entries of files that no longer exist. Returns the removed paths."""
+        existing = set(existing_paths)
+        removed = [p for p in self.files if p not in existing]
+        for p in removed:
+            del self.files[p]
+        return removed
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'settings': self.settings, 'files': self.files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
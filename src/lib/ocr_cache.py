@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = '.ocr_cache'
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200MB
+# Eviction frees space down to this share of max_bytes, so a full cache is not listed on every put
+EVICT_TARGET = 0.9
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    Return the SHA-256 hex digest of a file's content.
+    :param path: Path to the file.
+    :param chunk_size: Read size in bytes.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class OCRCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        On-disk cache of per-page extraction results with LRU eviction.
+        Entries are keyed by file content hash + page number + OCR settings,
+        so a renamed or moved PDF still hits and an edited one misses.
+        :param cache_dir: Folder where cache entries are stored.
+        :param max_bytes: Upper bound on the total size of the cache folder.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Running size of the cache folder: scanned on the first put, then kept up to date,
+        # so the folder is only listed again when the budget is exceeded
+        self._total = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(file_hash, page_no, settings):
+        """
+        Build a cache key.
+        :param file_hash: Content hash from file_digest().
+        :param page_no: 1-based page number.
+        :param settings: Dict of OCR settings (languages, resolution, ...).
+        """
+        settings_str = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+        raw = f"{file_hash}:{page_no}:{settings_str}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached entry (dict) or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        """Store an entry (JSON-serialisable dict) and evict old ones if over budget."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        try:
+            old_size = os.stat(path).st_size
+        except OSError:
+            old_size = 0
+        size = os.stat(tmp_path).st_size
+        os.replace(tmp_path, path)
+
+        if self._total is None:
+            self.evict()
+            return
+        self._total += size - old_size
+        if self._total > self.max_bytes:
+            # Rescan: other processes may have added or evicted entries meanwhile
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes (down to EVICT_TARGET of it)."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for e in it:
+                if not e.name.endswith('.json'):
+                    continue
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            self._total = total
+            return
+
+        entries.sort()
+        target = self.max_bytes * EVICT_TARGET
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= target:
+                break
+        self._total = total
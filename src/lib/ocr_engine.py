@@ -0,0 +1,49 @@
+import logging
+import os
+import threading
+
+from src.lib import instrumentation
+from src.lib import ocr_service
+
+# Suppress easyocr warnings
+logging.getLogger('easyocr').setLevel(logging.ERROR)
+
+DEFAULT_LANGUAGES = ('ja', 'en')
+# Opt-in: with EXCEL_WORK_OCR_SERVICE=1 the OCR worker (python -m src.app.ocr_server) is used
+# when it is running. Otherwise the model is always loaded in this process.
+USE_SERVICE = os.environ.get('EXCEL_WORK_OCR_SERVICE', '0') == '1'
+
+# One EasyOCR model per language set, shared by every caller in this process
+_readers = {}
+_lock = threading.Lock()
+
+def get_ocr_reader(languages=DEFAULT_LANGUAGES):
+    """
+    Return the process-wide EasyOCR reader for the given languages.
+    The model is loaded on the first call only, so runs that never OCR a page
+    (e.g. Excel-only folders) do not pay the load time or memory.
+    If the OCR worker is enabled (USE_SERVICE) and running (see src/lib/ocr_service.py),
+    a client for it is returned instead and no model is loaded here at all.
+    :param languages: Languages for OCR (default: ('ja', 'en'))
+    """
+    key = tuple(languages)
+    reader = _readers.get(key)
+    if reader is None:
+        with _lock:
+            reader = _readers.get(key)
+            if reader is None:
+                if USE_SERVICE:
+                    reader = ocr_service.connect(key, fallback=lambda: load_reader(key))
+                    if reader is not None:
+                        print(f"Using OCR service at {reader.address}")
+                if reader is None:
+                    reader = load_reader(key)
+                _readers[key] = reader
+    return reader
+
+def load_reader(languages):
+    """Load an EasyOCR model in this process."""
+    import easyocr
+    print("Initializing EasyOCR...")
+    with instrumentation.span('ocr.load', languages=','.join(languages)):
+        return easyocr.Reader(list(languages))
@@ -0,0 +1,154 @@
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+from src.lib import instrumentation
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """
+    How a PDF page is rendered before OCR.
+    :param dpi: Resolution of the first OCR pass.
+    :param grayscale: Render as 8-bit grayscale instead of RGB.
+    :param binarize: Threshold the image to black/white (implies grayscale).
+    :param threshold: Cut-off (0-255) used when binarize is on.
+    :param adaptive: Re-render at high_dpi when the first pass has low confidence.
+    :param high_dpi: Resolution of the second pass.
+    :param min_confidence: Mean readtext confidence below which the second pass runs.
+    """
+    dpi: int = 200
+    grayscale: bool = True
+    binarize: bool = False
+    threshold: int = 160
+    adaptive: bool = True
+    high_dpi: int = 300
+    min_confidence: float = 0.5
+
+    def cache_settings(self):
+        """Settings that change the OCR result (part of the cache key)."""
+        return asdict(self)
+
+# Most vendor PDFs read fine at 200 DPI grayscale; poor pages fall back to 300 DPI
+DEFAULT_PROFILE = RenderProfile()
+# Previous fixed behaviour: 300 DPI RGB, single pass
+HIGH_QUALITY_PROFILE = RenderProfile(dpi=300, grayscale=False, adaptive=False)
+
+def render_page(page, dpi, profile=DEFAULT_PROFILE):
+    """
+    Render a pdfplumber page to a numpy array for EasyOCR.
+    :param page: pdfplumber Page (or cropped page).
+    :param dpi: Render resolution.
+    :param profile: RenderProfile for colour mode / binarisation.
+    """
+    # pdfplumber to_image returns a PageImage, .original gives PIL Image
+    im = page.to_image(resolution=dpi).original
+    if profile.grayscale or profile.binarize:
+        im = im.convert('L')
+    if profile.binarize:
+        threshold = profile.threshold
+        im = im.point(lambda v: 255 if v > threshold else 0)
+    img_np = np.array(im)
+    im.close()
+    return img_np
+
+def mean_confidence(results):
+    """Mean confidence of readtext(detail=1) results (0.0 when nothing was read)."""
+    if not results:
+        return 0.0
+    return float(sum(r[2] for r in results)) / len(results)
+
+# Images in one readtext_batched call must have the same shape. Images whose sizes round up
+# to the same multiple of this many pixels are batched, padded white at the bottom/right
+# (so box coordinates do not move).
+BATCH_PAD = 64
+
+def _batch_shape(img):
+    h, w = img.shape[:2]
+    return (-(-h // BATCH_PAD) * BATCH_PAD, -(-w // BATCH_PAD) * BATCH_PAD) + img.shape[2:]
+
+def readtext_many(reader, images, batch_size=1):
+    """
+    readtext(detail=1) for several images, in as few detector passes as possible.
+    Images of the same (padded) shape go through readtext_batched together; an image
+    that has no partner is read on its own, unpadded.
+    :param reader: EasyOCR reader (readers without readtext_batched are called per image).
+    :param images: List of numpy images.
+    :param batch_size: Recogniser batch size, passed on to EasyOCR. It only has an effect on GPU:
+                       on CPU EasyOCR recognises the text boxes one at a time whatever its value,
+                       and readtext_batched batches the detector only.
+    :return: List of results, in the order of images.
+    """
+    results = [None] * len(images)
+    groups = {}
+    for i, img in enumerate(images):
+        groups.setdefault(_batch_shape(img), []).append(i)
+
+    batched = hasattr(reader, 'readtext_batched')
+    for shape, idx in groups.items():
+        if len(idx) == 1 or not batched:
+            for i in idx:
+                with instrumentation.span('ocr.recognize', batch=1):
+                    results[i] = reader.readtext(images[i], detail=1, batch_size=batch_size)
+            continue
+        # Pad to the largest image of the group (no padding when the pages are the same size)
+        height = max(images[i].shape[0] for i in idx)
+        width = max(images[i].shape[1] for i in idx)
+        padded = []
+        for i in idx:
+            img = images[i]
+            pad = [(0, height - img.shape[0]), (0, width - img.shape[1])] + [(0, 0)] * (img.ndim - 2)
+            padded.append(np.pad(img, pad, constant_values=255))
+        with instrumentation.span('ocr.recognize', batch=len(idx)):
+            group_results = reader.readtext_batched(padded, detail=1, batch_size=batch_size)
+        del padded
+        for i, r in zip(idx, group_results):
+            results[i] = r
+    return results
+
+def ocr_pages(reader, pages, profile=DEFAULT_PROFILE, batch_size=1):
+    """
+    OCR several pages (or crops) together: all are rendered, then read in batches.
+    In adaptive mode the pages whose mean confidence is below profile.min_confidence
+    are re-rendered at profile.high_dpi and read again (also batched).
+    :param reader: EasyOCR reader.
+    :param pages: List of pdfplumber Pages. All their images are in memory at once.
+    :param batch_size: Recogniser batch size (see readtext_many()).
+    :return: List of (readtext(detail=1) results, DPI of the returned results), in page order.
+    """
+    dpi = profile.dpi
+    images = []
+    for page in pages:
+        with instrumentation.span('ocr.render', dpi=dpi):
+            images.append(render_page(page, dpi, profile))
+    outputs = [(r, dpi) for r in readtext_many(reader, images, batch_size)]
+    del images
+
+    if profile.adaptive and profile.high_dpi > dpi:
+        retry = [i for i, (r, _) in enumerate(outputs) if mean_confidence(r) < profile.min_confidence]
+        if retry:
+            dpi = profile.high_dpi
+            instrumentation.incr('ocr_rerenders', len(retry))
+            images = []
+            for i in retry:
+                with instrumentation.span('ocr.render', dpi=dpi):
+                    images.append(render_page(pages[i], dpi, profile))
+            for i, r in zip(retry, readtext_many(reader, images, batch_size)):
+                outputs[i] = (r, dpi)
+            del images
+
+    return outputs
+
+def ocr_page(reader, page, profile=DEFAULT_PROFILE, batch_size=1):
+    """
+    OCR one page with the given render profile.
+    In adaptive mode the page is first read at profile.dpi and only re-rendered at
+    profile.high_dpi when the mean confidence is below profile.min_confidence.
+    :param reader: EasyOCR reader.
+    :param page: pdfplumber Page.
+    :return: (readtext(detail=1) results, DPI of the returned results)
+    """
+    return ocr_pages(reader, [page], profile, batch_size)[0]
+
+def results_to_text(results):
+    """Join readtext(detail=1) results into text, one detected box per line."""
+    return "\n".join(r[1] for r in results)
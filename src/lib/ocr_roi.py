@@ -0,0 +1,106 @@
+import numpy as np
+
+from src.lib import vendor_profiles
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# A table needs at least this many ruling lines/rects to be trusted
+MIN_RULES = 4
+# Do not crop to a region smaller than this share of the page (likely a stamp or a box)
+MIN_AREA_RATIO = 0.15
+# Padding around the detected table, in PDF points
+ROI_MARGIN = 10
+# Resolution of the cheap detection render for scanned pages
+DETECT_DPI = 50
+
+def find_override(filename, overrides=None):
+    """
+    Return the ROI override (x0, top, x1, bottom as fractions of the page) for a filename, or None.
+    :param overrides: {filename keyword: roi}; default: the roi of the matching vendor profile
+                      (config/vendor_profiles.json).
+    """
+    if not filename:
+        return None
+    if overrides is None:
+        profile = vendor_profiles.find_profile(filename)
+        return profile.roi if profile is not None else None
+    for key, roi in overrides.items():
+        if key in filename:
+            return roi
+    return None
+
+def _bbox_from_rules(page, min_rules):
+    """Largest ruled table found from the page's vector lines/rects (text/vector PDFs)."""
+    if len(page.lines) + len(page.rects) < min_rules:
+        return None
+    tables = page.find_tables()
+    if not tables:
+        return None
+    x0, top, x1, bottom = max((t.bbox for t in tables), key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+    # find_tables() works in page coordinates; make them relative like _bbox_from_image()
+    px0, ptop = page.bbox[0], page.bbox[1]
+    return (x0 - px0, top - ptop, x1 - px0, bottom - ptop)
+
+def _bbox_from_image(page, dpi=DETECT_DPI):
+    """Find table ruling lines on a low resolution render with OpenCV (scanned PDFs)."""
+    if cv2 is None:
+        return None
+    im = page.to_image(resolution=dpi).original.convert('L')
+    gray = np.array(im)
+    im.close()
+
+    # Dark lines become white on black
+    binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    h, w = binary.shape
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 15, 10), 1)))
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 30, 10))))
+    mask = cv2.bitwise_or(horizontal, vertical)
+
+    # The line-item table is the largest connected grid of ruling lines
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    if count < 2:
+        return None
+    areas = stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT]
+    x, y, bw, bh = stats[1 + int(np.argmax(areas)), :4]
+    scale = 72.0 / dpi
+    return (float(x * scale), float(y * scale), float((x + bw) * scale), float((y + bh) * scale))
+
+def find_table_bbox(page, min_rules=MIN_RULES, min_area_ratio=MIN_AREA_RATIO, margin=ROI_MARGIN):
+    """
+    Locate the line-item table on a page.
+    Uses pdfplumber's line/rect objects when present, otherwise a cheap OpenCV
+    line detection on a low resolution render.
+    :return: bbox (x0, top, x1, bottom) in PDF points (page coordinates), or None.
+    """
+    bbox = _bbox_from_rules(page, min_rules) or _bbox_from_image(page)
+    if bbox is None:
+        return None
+
+    x0, top, x1, bottom = bbox
+    if (x1 - x0) * (bottom - top) < min_area_ratio * page.width * page.height:
+        return None
+
+    # Coordinates above are relative to the page; shift into pdfplumber's bbox space
+    px0, ptop, px1, pbottom = page.bbox
+    return (max(px0, px0 + x0 - margin), max(ptop, ptop + top - margin),
+            min(px1, px0 + x1 + margin), min(pbottom, ptop + bottom + margin))
+
+def crop_to_table(page, filename=None, overrides=None):
+    """
+    Return the part of the page to OCR: the vendor override if one matches the
+    filename, else the detected table, else the whole page.
+    """
+    roi = find_override(filename, overrides)
+    if roi is not None:
+        px0, ptop, px1, pbottom = page.bbox
+        w, h = px1 - px0, pbottom - ptop
+        bbox = (px0 + roi[0] * w, ptop + roi[1] * h, px0 + roi[2] * w, ptop + roi[3] * h)
+    else:
+        bbox = find_table_bbox(page)
+
+    if bbox is None:
+        return page
+    return page.crop(bbox)
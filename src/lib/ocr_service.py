@@ -0,0 +1,309 @@
+import os
+import secrets
+import stat
+import sys
+import tempfile
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+from src.lib import instrumentation
+
+# Long-lived OCR worker: one process keeps the EasyOCR model loaded and serves readtext /
+# readtext_batched / recognize (page images) and extract_text (PDF paths) to other processes
+# of the same user over a local socket, so short CLI runs do not load the model again.
+#
+# Results travel as pickles, so both sides must be sure who is at the other end:
+# - the socket and the key live in a per-user directory only the user can open (0700),
+# - the connection handshake uses a random key the worker writes there (0600) at start-up;
+#   multiprocessing's handshake is mutual, so a process that squats the address without
+#   the key can neither be served nor pass itself off as the worker,
+# - clients check the owner and mode of the directory, the key file and the socket first.
+
+KEY_FILE = 'ocr_service.key'
+SOCKET_FILE = 'ocr_service.sock'
+
+class OCRServiceError(Exception):
+    """The worker could not run the request (the message is the worker's exception)."""
+
+class UnsafePathError(PermissionError):
+    """A runtime file is not private to the current user; the service is not used."""
+
+
+def _runtime_path():
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('LOCALAPPDATA') or tempfile.gettempdir(), 'excel_work')
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'excel_work')
+    return os.path.join(tempfile.gettempdir(), f'excel_work-{os.getuid()}')
+
+def runtime_dir(create=False):
+    """
+    Per-user directory of the socket and the key (mode 0700): under $XDG_RUNTIME_DIR, else in
+    the temp directory (the local app data folder on Windows).
+    :param create: Create it (worker side); clients only use an existing directory.
+    :return: Path, or None if it does not exist and create is False.
+    :raises UnsafePathError: It exists but is not private to this user.
+    """
+    path = _runtime_path()
+    if create:
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    elif not os.path.isdir(path):
+        return None
+    _check_private(path, is_dir=True)
+    return path
+
+def _check_private(path, is_dir=False, is_socket=False):
+    """Raise UnsafePathError unless path is owned by this user and not accessible to others (POSIX)."""
+    if sys.platform == 'win32':
+        return  # Per-user profile folder; the pipe is protected by the key
+    st = os.lstat(path)
+    kind_ok = stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISSOCK(st.st_mode) if is_socket else stat.S_ISREG(st.st_mode)
+    if not kind_ok or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise UnsafePathError(f"{path} is not private to this user (owner {st.st_uid}, mode {stat.filemode(st.st_mode)})")
+
+def default_address():
+    """Socket in the per-user runtime directory (a per-user named pipe on Windows); EXCEL_WORK_OCR_SOCKET overrides it."""
+    address = os.environ.get('EXCEL_WORK_OCR_SOCKET')
+    if address:
+        return address
+    if sys.platform == 'win32':
+        user = os.environ.get('USERNAME', 'user')
+        return rf'\\.\pipe\excel_work_ocr_{user}'
+    return os.path.join(_runtime_path(), SOCKET_FILE)
+
+def _family(address):
+    return 'AF_PIPE' if address.startswith('\\\\') else 'AF_UNIX'
+
+def _key_path(create=False):
+    directory = runtime_dir(create)
+    return os.path.join(directory, KEY_FILE) if directory else None
+
+def write_key():
+    """New random key for this worker, readable by the user only. Returns the key."""
+    key = secrets.token_bytes(32)
+    path = _key_path(create=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    os.replace(tmp_path, path)
+    return key
+
+def read_key():
+    """Key of the running worker, or None if there is none.
+    :raises UnsafePathError: The key file or its directory is accessible to other users.
+    """
+    path = _key_path()
+    if path is None or not os.path.exists(path):
+        return None
+    _check_private(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _open(address):
+    """
+    Authenticated connection to the worker at address.
+    :raises OSError/EOFError/ValueError: No worker, wrong key, or unsafe runtime files.
+    """
+    if _family(address) == 'AF_UNIX':
+        _check_private(address, is_socket=True)
+    key = read_key()
+    if key is None:
+        raise FileNotFoundError("no OCR service key")
+    return Client(address, family=_family(address), authkey=key)
+
+
+class OCRClient:
+    def __init__(self, conn, address, languages, fallback=None):
+        """
+        Connection to a running OCR worker. Has the methods of easyocr.Reader that the
+        pipeline uses, so it can be passed wherever a reader is expected.
+        :param fallback: Returns an in-process reader; used when the worker goes away.
+        """
+        self.conn = conn
+        self.address = address
+        self.languages = tuple(languages)
+        self.fallback = fallback
+        self._local = None
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args, **kwargs):
+        if self._local is None:
+            try:
+                with self._lock:
+                    self.conn.send((method, args, kwargs))
+                    status, value = self.conn.recv()
+            except (EOFError, OSError) as e:
+                if self.fallback is None:
+                    raise
+                print(f"OCR service at {self.address} is gone ({e}). Loading the model in this process.")
+                self._local = self.fallback()
+            else:
+                if status == 'error':
+                    raise OCRServiceError(value)
+                return value
+        if method == 'extract_text':
+            from src.lib.pdf_reader import PDFReader
+            return PDFReader(self.languages).extract_text(*args, **kwargs)
+        return getattr(self._local, method)(*args, **kwargs)
+
+    def readtext(self, image, **kwargs):
+        return self._call('readtext', image, **kwargs)
+
+    def readtext_batched(self, images, **kwargs):
+        return self._call('readtext_batched', images, **kwargs)
+
+    def recognize(self, image, **kwargs):
+        return self._call('recognize', image, **kwargs)
+
+    def extract_text(self, pdf_path):
+        """Text of a PDF read by the worker (PDFReader.extract_text() in the worker process)."""
+        return self._call('extract_text', os.path.abspath(pdf_path))
+
+    def close(self):
+        self.conn.close()
+
+def connect(languages, address=None, fallback=None):
+    """
+    Client for the worker at address if one is running with the same languages, else None.
+    """
+    address = address or default_address()
+    if _family(address) == 'AF_UNIX' and not os.path.exists(address):
+        return None
+    try:
+        with instrumentation.span('ocr.connect'):
+            conn = _open(address)
+            conn.send(('ping', (), {}))
+            status, served = conn.recv()
+    except UnsafePathError as e:
+        print(f"OCR service not used: {e}")
+        return None
+    except (OSError, EOFError, ValueError):
+        return None
+    if status != 'ok' or tuple(served) != tuple(languages):
+        conn.close()
+        return None
+    return OCRClient(conn, address, languages, fallback)
+
+def stop(address=None):
+    """Ask the worker at address to exit. Returns False if none is running."""
+    address = address or default_address()
+    try:
+        conn = _open(address)
+    except (OSError, EOFError, ValueError):
+        return False
+    with conn:
+        conn.send(('stop', (), {}))
+        conn.recv()
+    return True
+
+
+class OCRServer:
+    def __init__(self, reader, languages, address=None):
+        """
+        :param reader: In-process EasyOCR reader (loaded once, shared by all connections).
+        """
+        self.reader = reader
+        self.languages = tuple(languages)
+        self.address = address or default_address()
+        self.running = False
+        self._key = None
+        # The model is not thread-safe and uses every core anyway: one request at a time
+        self._ocr_lock = threading.Lock()
+
+    def serve_forever(self):
+        family = _family(self.address)
+        runtime_dir(create=True)  # refuses a directory that others can access
+        if family == 'AF_UNIX' and os.path.exists(self.address):
+            if _is_alive(self.address):
+                raise RuntimeError(f"An OCR service is already running at {self.address}")
+            os.remove(self.address)  # left over from a worker that was killed
+        self._key = write_key()
+        # Created private: there is no moment in which others could connect to the socket
+        old_umask = os.umask(0o077)
+        try:
+            listener = Listener(self.address, family=family, authkey=self._key)
+        finally:
+            os.umask(old_umask)
+        print(f"OCR service listening on {self.address} (languages: {', '.join(self.languages)})")
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    # Failed handshake (wrong key, client gone); keep serving
+                    if self.running:
+                        print(f"Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            _remove_key(self._key)
+            print("OCR service stopped.")
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    value = self._dispatch(method, args, kwargs)
+                    conn.send(('ok', value))
+                except Exception as e:
+                    conn.send(('error', f"{type(e).__name__}: {e}"))
+                if method == 'stop':
+                    self._shutdown()
+                    return
+
+    def _dispatch(self, method, args, kwargs):
+        if method == 'ping':
+            return list(self.languages)
+        if method == 'stop':
+            return None
+        if method in ('readtext', 'readtext_batched', 'recognize'):
+            with self._ocr_lock, instrumentation.span('ocr.service', method=method):
+                return getattr(self.reader, method)(*args, **kwargs)
+        if method == 'extract_text':
+            from src.lib.pdf_reader import PDFReader
+            with self._ocr_lock, instrumentation.span('ocr.service', method=method):
+                return PDFReader(self.languages).extract_text(*args, **kwargs)
+        raise ValueError(f"Unknown request: {method}")
+
+    def _shutdown(self):
+        self.running = False
+        # Wake up accept() with a throwaway connection
+        try:
+            Client(self.address, family=_family(self.address), authkey=self._key).close()
+        except (OSError, EOFError):
+            pass
+
+def _remove_key(key):
+    """Delete the key file if it is still this worker's (a newer worker may have replaced it)."""
+    try:
+        if read_key() == key:
+            os.remove(_key_path())
+    except OSError:
+        pass
+
+def _is_alive(address):
+    try:
+        conn = _open(address)
+    except (OSError, EOFError, ValueError):
+        return False
+    conn.close()
+    return True
+
+def serve(languages, address=None):
+    """Load the model in this process and serve it until stopped (blocks)."""
+    from src.lib import ocr_engine
+    # This process is the service: its readers (also inside PDFReader) are local
+    ocr_engine.USE_SERVICE = False
+    reader = ocr_engine.get_ocr_reader(languages)
+    OCRServer(reader, languages, address).serve_forever()
@@ -0,0 +1,61 @@
+import re
+
+# Shared, precompiled patterns for the quotation parsers.
+# Compile once at import; parsers call .match()/.search() on these per OCR line.
+
+# Price token: "¥1,000", "50,100-", "1200.5" (yen sign, commas, trailing '-' are allowed)
+PRICE_TOKEN = r'[¥￥]?[\d,]+(?:\.\d+)?[-－]?'
+PRICE = re.compile(f'^{PRICE_TOKEN}$')
+QUANTITY = re.compile(r'^\d+$')
+
+# One OCR line ending with: Qty Unit Price Amount
+# Group 1: Product (everything before), 2: Qty, 3: Unit, 4: Unit Price, 5: Amount
+OCR_ITEM_LINE = re.compile(fr'(.*?)\s+(\d+)\s+([^\s\d]+)\s+({PRICE_TOKEN})\s+({PRICE_TOKEN})$')
+
+DATE = re.compile(r'\d{4}[-/年]\d{1,2}[-/月]')
+PHONE = re.compile(r'\d{2,4}-\d{2,4}-\d{4}')
+# Either of the above in one pass (values that must not be read as prices)
+DATE_OR_PHONE = re.compile(f'{DATE.pattern}|{PHONE.pattern}')
+# Phone numbers on OCR lines (06-..., 072-...)
+PHONE_LINE = re.compile(r'0\d{1,4}-\d{1,4}-\d{4}')
+
+NUMBER = re.compile(r'[\d,]+')
+TRAILING_PRICE = re.compile(r'([\d,]+)-?$')
+
+# Part number: uppercase followed by digits (e.g. TEM2521_80-P001)
+PART_NO = re.compile(r'([A-Z]+\d+[_\-0-9A-Z]*)')
+NAME_PREFIX_JUNK = re.compile(r'^[_:|\- ]+')
+# Two or more kana/kanji (name candidate)
+JAPANESE_TEXT = re.compile(r'[ぁ-んァ-ン一-龥]{2,}')
+
+if __name__ == "__main__":
+    # Micro-benchmark: per-call f-string patterns (old parsers) vs the precompiled registry
+    import timeit
+
+    lines = ['TEM2521_80-P001 中板', '1', '個', '50,100-', '50,100', 'TEL 072-123-4567',
+             '2026年1月5日', 'ブラケット SS400 2 個 ¥3,450 6,900'] * 250
+
+    def old_style():
+        for s in lines:
+            re.match(f'^{PRICE_TOKEN}$', s)
+            re.match(r'^\d+$', s)
+            re.search(r'\d{4}[-/年]\d{1,2}[-/月]', s)
+            re.search(r'\d{2,4}-\d{2,4}-\d{4}', s)
+            re.search(r'([A-Z]+\d+[_\-0-9A-Z]*)', s)
+            re.compile(fr'(.*?)\s+(\d+)\s+([^\s\d]+)\s+({PRICE_TOKEN})\s+({PRICE_TOKEN})$').search(s)
+
+    def registry():
+        for s in lines:
+            PRICE.match(s)
+            QUANTITY.match(s)
+            DATE_OR_PHONE.search(s)
+            PART_NO.search(s)
+            OCR_ITEM_LINE.search(s)
+
+    n = 20
+    t_old = min(timeit.repeat(old_style, number=n, repeat=3)) / n
+    t_new = min(timeit.repeat(registry, number=n, repeat=3)) / n
+    print(f"{len(lines)} lines per run")
+    print(f"per-call patterns : {t_old * 1000:.2f} ms")
+    print(f"precompiled       : {t_new * 1000:.2f} ms")
+    print(f"speedup           : {t_old / t_new:.1f}x")
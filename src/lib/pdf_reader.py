@@ -1,59 +1,216 @@
 import pdfplumber
-import easyocr
 import os
 import io
+import sys
+
+# Also runnable as a script (python src/lib/pdf_reader.py <pdf_path>)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.lib.ocr_cache import OCRCache, file_digest
+from src.lib.ocr_engine import get_ocr_reader
+from src.lib.ocr_render import DEFAULT_PROFILE, ocr_pages, results_to_text
+from src.lib import ocr_roi
+from src.lib import hybrid_pdf
+from src.lib.hybrid_pdf import Token
+from src.lib import instrumentation
+from src.lib import cell_ocr
 
 class PDFReader:
-    def __init__(self, languages=['ja', 'en']):
+    def __init__(self, languages=['ja', 'en'], cache=None, profile=DEFAULT_PROFILE, roi=True, roi_overrides=None,
+                 ocr_batch_pages=4, ocr_batch_size=16, cell_ocr=True, skip_ocr_errors=False):
         """
         Initialize the PDFReader with OCR languages.
         :param languages: List of languages for OCR (default: ['ja', 'en'])
+        :param cache: Optional OCRCache. Pages already in the cache are not re-extracted.
+        :param profile: RenderProfile used for OCR (DPI, grayscale, adaptive re-render).
+        :param roi: OCR only the line-item table area when it can be located.
+        :param roi_overrides: {filename keyword: roi} (default: the roi of the matching vendor profile).
+        :param ocr_batch_pages: Pages that need OCR are collected up to this many and read in one
+                                batched call (1 = page by page). Bounds the page images held in memory.
+        :param ocr_batch_size: Text boxes per recogniser forward pass (see ocr_render.readtext_many).
+        :param cell_ocr: Read ruled tables cell by cell with the recogniser only (no text
+                         detector) when their grid can be recovered (see src/lib/cell_ocr.py).
+        :param skip_ocr_errors: A page whose OCR fails keeps only its text-layer text (the error is
+                                printed) instead of the error ending the whole document.
+        """
+        self.languages = list(languages)
+        self.cache = cache
+        self.profile = profile
+        self.roi = roi
+        self.roi_overrides = roi_overrides
+        self.ocr_batch_pages = max(1, ocr_batch_pages)
+        self.ocr_batch_size = ocr_batch_size
+        self.cell_ocr = cell_ocr
+        self.skip_ocr_errors = skip_ocr_errors
+
+    @property
+    def reader(self):
+        """EasyOCR reader, loaded on the first page that actually needs OCR."""
+        return get_ocr_reader(self.languages)
+
+    def _cache_settings(self, filename=None):
+        """OCR settings that affect the result (part of the cache key)."""
+        roi = ocr_roi.find_override(filename, self.roi_overrides) if self.roi else None
+        return {'languages': self.languages, 'render': self.profile.cache_settings(),
+                'roi': self.roi, 'roi_override': roi, 'hybrid': True, 'cell_ocr': self.cell_ocr}
+
+    def iter_pages(self, pdf_path):
+        """
+        Extract text page by page. The PDF text layer is used wherever it exists; only
+        pages without any text and large images without text over them are OCR'd
+        (see hybrid_pdf.untexted_regions). Pages that need OCR are held back until ocr_batch_pages of them are collected
+        (or the document ends) and then read in one batched call; pages are still
+        yielded in order. Memory stays bounded by one batch regardless of document length.
+        :param pdf_path: Path to the PDF file.
+        :return: Generator of dicts {'page': page number, 'text': str,
+                 'method': 'text'|'ocr'|'hybrid'|'cache', 'tokens': list of hybrid_pdf.Token,
+                 'rules': vertical ruling lines (x, top, bottom)}.
+                 'tokens' are the positioned words/OCR boxes (empty for old cache entries).
         """
-        self.reader = easyocr.Reader(languages) if easyocr else None
+        filename = os.path.basename(pdf_path)
+        with instrumentation.span('pdf.hash', file=filename):
+            file_hash = file_digest(pdf_path) if self.cache else None
+        settings = self._cache_settings(filename)
+
+        with instrumentation.span('pdf.open', file=filename):
+            pdf = pdfplumber.open(pdf_path)
+        with pdf:
+            queue = []    # results in page order; OCR pages have text None until their batch is read
+            pending = []  # (result, page, regions, cache key) waiting for OCR
+            for i, page in enumerate(pdf.pages):
+                # The span is closed before the page is yielded, so it does not include the caller's parsing
+                with instrumentation.span('pdf.page', file=filename, page=i + 1) as record:
+                    # Reuse the result of a previous run if the file is unchanged
+                    key = None
+                    entry = None
+                    if self.cache:
+                        key = OCRCache.make_key(file_hash, i + 1, settings)
+                        entry = self.cache.get(key)
+                        instrumentation.incr('ocr_cache_lookups', result='hit' if entry is not None else 'miss')
+
+                    regions = []
+                    if entry is not None:
+                        tokens = [Token(*t) for t in entry.get('tokens', [])]
+                        rules = [tuple(r) for r in entry.get('rules', [])]
+                        result = {'page': i + 1, 'text': entry['text'], 'method': 'cache', 'tokens': tokens, 'rules': rules}
+                    else:
+                        # Text layer first (positioned words); OCR only what it does not cover
+                        with instrumentation.span('pdf.text', file=filename, page=i + 1):
+                            tokens = hybrid_pdf.text_tokens(page)
+                            regions = hybrid_pdf.untexted_regions(page, tokens)
+                            rules = hybrid_pdf.vertical_rules(page)
+
+                        if regions:
+                            method = 'hybrid' if tokens else 'ocr'
+                            result = {'page': i + 1, 'text': None, 'method': method, 'tokens': tokens, 'rules': rules}
+                        else:
+                            text = page.extract_text() or ''
+                            result = {'page': i + 1, 'text': text, 'method': 'text', 'tokens': tokens, 'rules': rules}
+                            if self.cache:
+                                self.cache.put(key, self._cache_entry(result))
+
+                    record['method'] = result['method']
+                    instrumentation.incr('pdf_pages', method=result['method'])
+
+                queue.append(result)
+                if regions:
+                    # Page is kept open until its batch is read
+                    pending.append((result, page, regions, key))
+                    if len(pending) >= self.ocr_batch_pages:
+                        self._ocr_batch(pending, filename)
+                        pending = []
+                else:
+                    # Drop pdfplumber's cached objects for this page
+                    page.close()
+
+                while queue and queue[0]['text'] is not None:
+                    yield queue.pop(0)
+
+            if pending:
+                self._ocr_batch(pending, filename)
+            yield from queue
+
+    def _ocr_batch(self, pending, filename=None):
+        """OCR the regions of the collected pages in one batch and fill in their text and tokens."""
+        if not self.skip_ocr_errors:
+            self._read_batch(pending, filename)
+            return
+        try:
+            self._read_batch(pending, filename)
+        except Exception as e:
+            pending = [p for p in pending if p[0]['text'] is None]
+            if len(pending) > 1:
+                # Read the pages one by one so only the failing ones lose their OCR text
+                for item in pending:
+                    self._ocr_batch([item], filename)
+                return
+            for result, page, _, _ in pending:
+                print(f"[PDFReader] Page {result['page']}: OCR failed: {e}")
+                instrumentation.incr('errors', kind='ocr')
+                result['text'] = hybrid_pdf.tokens_to_text(result['tokens'])
+                page.close()
+
+    def _read_batch(self, pending, filename=None):
+        crops = []
+        for _, page, regions, _ in pending:
+            with instrumentation.span('ocr.roi', file=filename):
+                crops.append(hybrid_pdf.region_crops(page, regions, filename, self.roi, self.roi_overrides))
+
+        all_crops = [c for page_crops in crops for c in page_crops]
+        cell_rules = []
+        with instrumentation.span('ocr.batch', file=filename, pages=len(pending)):
+            if self.cell_ocr:
+                outputs = cell_ocr.ocr_pages(self.reader, all_crops, self.profile, self.ocr_batch_size, rules=cell_rules)
+            else:
+                outputs = ocr_pages(self.reader, all_crops, self.profile, self.ocr_batch_size)
+        outputs = iter(outputs)
+        cell_rules = iter(cell_rules)
+
+        for (result, page, regions, key), page_crops in zip(pending, crops):
+            region_results = [(crop, next(outputs)) for crop in page_crops]
+            ocr_tokens = []
+            read_rules = []
+            for crop, (results, dpi) in region_results:
+                ocr_tokens.extend(hybrid_pdf.ocr_tokens(results, crop, dpi))
+                read_rules.extend(next(cell_rules, []))
+            # Cell edges of a table read cell by cell are where the text was read; the vector
+            # rules of a scanned form need not line up with the scan
+            if read_rules:
+                result['rules'] = read_rules if result['method'] == 'ocr' else result['rules'] + read_rules
+
+            if result['method'] == 'ocr':
+                # Scanned page: one line per OCR box, in EasyOCR's order
+                result['text'] = "\n".join(results_to_text(results) for _, (results, _) in region_results)
+            else:
+                result['text'] = hybrid_pdf.tokens_to_text(result['tokens'] + ocr_tokens)
+            result['tokens'] = result['tokens'] + ocr_tokens
+            page.close()
+            if self.cache:
+                self.cache.put(key, self._cache_entry(result))
+
+    @staticmethod
+    def _cache_entry(result):
+        return {'text': result['text'], 'method': result['method'],
+                'tokens': [list(t) for t in result['tokens']], 'rules': [list(r) for r in result['rules']]}
 
     def extract_text(self, pdf_path):
         """
-        Extract text from a PDF file. Automatically switches to OCR if text is sparse.
+        Extract text from a PDF file. OCR is used only where the PDF has no text layer.
         :param pdf_path: Path to the PDF file.
         :return: Extracted text as a string (pages separated by newlines).
         """
-        full_text = ""
+        parts = []
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages):
-                    # Try text extraction first
-                    text = page.extract_text()
-                    
-                    # Heuristic: If text is very short (likely just header/footer or empty), try OCR
-                    if not text or len(text.strip()) < 50:
-                        # Convert page to image for OCR
-                        # pdfplumber to_image returns a PageImage, .original gives PIL Image
-                        im = page.to_image(resolution=300).original
-                        
-                        # Convert PIL image to bytes for easyocr (or pass numpy array if compatible, 
-                        # but easyocr accepts bytes or file path. It also accepts numpy array)
-                        # EasyOCR readtext accepts: file path, url, byte, numpy array
-                        import numpy as np
-                        img_np = np.array(im)
-                        
-                        ocr_result = self.reader.readtext(img_np, detail=0)
-                        text = "\n".join(ocr_result)
-                        print(f"[PDFReader] Page {i+1}: Used OCR.")
-                    else:
-                         print(f"[PDFReader] Page {i+1}: Used Text Extraction.")
-
-                    full_text += f"\n--- Page {i+1} ---\n{text}"
-                    
+            for result in self.iter_pages(pdf_path):
+                parts.append(f"\n--- Page {result['page']} ---\n{result['text']}")
         except Exception as e:
             return f"Error reading PDF: {e}"
 
-        return full_text
+        return "".join(parts)
 
 if __name__ == "__main__":
     # Test execution
-    import sys
     if len(sys.argv) > 1:
-        reader = PDFReader()
+        reader = PDFReader(cache=OCRCache())
         print(reader.extract_text(sys.argv[1]))
     else:
         print("Usage: python pdf_reader.py <pdf_path>")
@@ -0,0 +1,190 @@
+import math
+import os
+import time
+
+from openpyxl.utils import get_column_letter
+
+# Google credentials are shared by all projects (see 02_setup_service_account.md)
+KEY_FILE = os.path.expanduser('~/.gemini/credentials.json')
+SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+# HTTP statuses worth retrying: quota exceeded and temporary server errors
+RETRY_STATUSES = (429, 500, 502, 503)
+
+def open_worksheet(sheet_name, worksheet_index=0, key_file=KEY_FILE):
+    """
+    Authenticate with the service account key and open a worksheet.
+    gspread/oauth2client are imported here so the rest of this module works without them.
+    """
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    if not os.path.exists(key_file):
+        raise FileNotFoundError(f"認証ファイルが見つかりません: {key_file}")
+    creds = ServiceAccountCredentials.from_json_keyfile_name(key_file, SCOPE)
+    client = gspread.authorize(creds)
+    return client.open(sheet_name).get_worksheet(worksheet_index)
+
+def is_retryable(error):
+    """True for quota / rate limit errors (gspread APIError carries the HTTP response)."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status in RETRY_STATUSES:
+        return True
+    text = str(error)
+    return 'RATE_LIMIT_EXCEEDED' in text or 'Quota exceeded' in text
+
+def call_with_retry(func, *args, retries=5, base_delay=1.0, sleep=time.sleep, **kwargs):
+    """Call an API method, retrying quota errors with exponential backoff (1s, 2s, 4s, ...)."""
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = base_delay * (2 ** attempt)
+            print(f"[SheetsSync] Quota/temporary error, retrying in {delay:.0f}s: {e}")
+            sleep(delay)
+
+def to_cell_value(value):
+    """pandas/numpy values -> plain values for the Sheets API (missing values become '')."""
+    if value is None:
+        return ''
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ''
+        if value.is_integer():
+            return int(value)
+    if not isinstance(value, (int, float, str, bool)):
+        # pd.NA, timestamps, ...
+        text = str(value)
+        return '' if text in ('<NA>', 'NaT', 'nan') else text
+    return value
+
+def _as_text(row, width):
+    """A row as the strings get_all_values() returns, padded to width."""
+    text = ['' if v is None else str(v) for v in row]
+    return text + [''] * (width - len(text))
+
+def changed_blocks(current, desired, width):
+    """
+    Compare rows that exist on both sides.
+    :return: List of (first, last) 1-based row numbers of contiguous changed rows.
+    """
+    blocks = []
+    start = None
+    for i in range(min(len(current), len(desired))):
+        if _as_text(current[i], width) != _as_text(desired[i], width):
+            if start is None:
+                start = i + 1
+        elif start is not None:
+            blocks.append((start, i))
+            start = None
+    if start is not None:
+        blocks.append((start, min(len(current), len(desired))))
+    return blocks
+
+class SheetSync:
+    def __init__(self, worksheet, retries=5, base_delay=1.0, sleep=time.sleep):
+        """
+        Mirror a table (header + rows) to a worksheet with as few API calls as possible.
+        :param worksheet: gspread Worksheet, or any object with get_all_values / batch_update /
+                          append_rows / batch_clear (e.g. InMemoryWorksheet).
+        :param retries: Retries per API call on quota errors.
+        :param base_delay: First backoff delay in seconds.
+        :param sleep: Sleep function (replaceable for tests).
+        """
+        self.worksheet = worksheet
+        self.retry_kwargs = {'retries': retries, 'base_delay': base_delay, 'sleep': sleep}
+
+    def _call(self, func, *args, **kwargs):
+        return call_with_retry(func, *args, **self.retry_kwargs, **kwargs)
+
+    def sync(self, header, rows):
+        """
+        Make the worksheet equal to header + rows.
+        The current contents are read once; only changed row blocks are sent (one
+        batch_update), extra rows are appended in one call and leftover rows cleared.
+        :return: Dict with the number of updated, appended and cleared rows.
+        """
+        desired = [[to_cell_value(v) for v in header]] + [[to_cell_value(v) for v in row] for row in rows]
+        current = self._call(self.worksheet.get_all_values)
+
+        width = max([len(r) for r in desired] + [len(r) for r in current] + [1])
+        last_col = get_column_letter(width)
+
+        blocks = changed_blocks(current, desired, width)
+        if blocks:
+            data = []
+            for first, last in blocks:
+                values = [r + [''] * (width - len(r)) for r in desired[first - 1:last]]
+                data.append({'range': f"A{first}:{last_col}{last}", 'values': values})
+            self._call(self.worksheet.batch_update, data, value_input_option='USER_ENTERED')
+
+        appended = desired[len(current):]
+        if appended:
+            self._call(self.worksheet.append_rows, appended, value_input_option='USER_ENTERED')
+
+        cleared = len(current) - len(desired)
+        if cleared > 0:
+            self._call(self.worksheet.batch_clear, [f"A{len(desired) + 1}:{last_col}{len(current)}"])
+
+        return {
+            'updated_rows': sum(last - first + 1 for first, last in blocks),
+            'appended_rows': len(appended),
+            'cleared_rows': max(cleared, 0),
+        }
+
+class InMemoryWorksheet:
+    def __init__(self, values=None):
+        """
+        Local stand-in for a gspread Worksheet (dry runs and tests).
+        Values are stored as strings like the real get_all_values(); every API call is logged.
+        """
+        self.values = [[str(v) for v in row] for row in (values or [])]
+        self.calls = []
+
+    def get_all_values(self):
+        self.calls.append(('get_all_values',))
+        # Trailing empty rows are not returned by the API
+        rows = [list(r) for r in self.values]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        return rows
+
+    def _set(self, row, col, value):
+        while len(self.values) < row:
+            self.values.append([])
+        line = self.values[row - 1]
+        while len(line) < col:
+            line.append('')
+        line[col - 1] = '' if value is None else str(value)
+
+    def batch_update(self, data, **kwargs):
+        from openpyxl.utils.cell import range_boundaries
+        self.calls.append(('batch_update', len(data)))
+        for item in data:
+            min_col, min_row, _, _ = range_boundaries(item['range'])
+            for r, row in enumerate(item['values']):
+                for c, value in enumerate(row):
+                    self._set(min_row + r, min_col + c, value)
+
+    def append_rows(self, values, **kwargs):
+        self.calls.append(('append_rows', len(values)))
+        start = len(self.get_all_values())
+        self.calls.pop() # internal call, not an API request
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                self._set(start + r + 1, c + 1, value)
+
+    def batch_clear(self, ranges):
+        from openpyxl.utils.cell import range_boundaries
+        self.calls.append(('batch_clear', len(ranges)))
+        for a1 in ranges:
+            min_col, min_row, max_col, max_row = range_boundaries(a1)
+            for r in range(min_row, max_row + 1):
+                for c in range(min_col, max_col + 1):
+                    if r <= len(self.values) and c <= len(self.values[r - 1]):
+                        self.values[r - 1][c - 1] = ''
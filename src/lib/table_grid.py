@@ -0,0 +1,147 @@
+import pandas as pd
+
+from src.lib import header_detect
+from src.lib.hybrid_pdf import group_lines
+
+# Rows with at least this many cells are table rows; only they define the columns
+MIN_ROW_CELLS = 3
+# Cells whose x ranges are closer than this (PDF points) belong to the same column
+COLUMN_GAP = 2.0
+# Ruling lines closer than this (PDF points) are one separator (double lines, stroke width)
+RULE_MERGE = 3.0
+# A column rule spans at least this share of the header-row height (shorter edges are underlines, glyph parts)
+MIN_RULE_HEIGHT = 0.8
+
+def join_text(texts):
+    """
+    Join token texts of one cell/row. Spaced-out CJK characters ("合 計", "品 名") are
+    joined without the space so keywords match; other tokens keep one space.
+    """
+    out = ''
+    for text in texts:
+        if out and not (ord(out[-1]) > 0x2E7F and ord(text[0]) > 0x2E7F):
+            out += ' '
+        out += text
+    return out
+
+def token_rows(tokens):
+    """
+    Positioned tokens (text-layer words and/or OCR boxes) -> rows, top to bottom,
+    each sorted left to right (one sort + one sweep, see hybrid_pdf.group_lines).
+    """
+    return group_lines(tokens)
+
+def find_header(rows, patterns, required):
+    """
+    Position of the first row whose text contains a keyword of every required category
+    (see header_detect.find_header_row), or None. Rows above it (title, addresses) are
+    not part of the table and must not shape its columns.
+    """
+    text = pd.DataFrame([[join_text([t.text for t in row])] for row in rows], dtype=object)
+    idx = header_detect.find_header_row(text, patterns, required)
+    return None if idx is None else int(idx)
+
+def column_bands(rows, min_cells=MIN_ROW_CELLS, gap=COLUMN_GAP):
+    """
+    Column x ranges from a sort-and-sweep over the cells of the table rows:
+    intervals sorted by x0 are merged while they overlap (or nearly touch).
+    :param rows: Lists of Tokens, one per row.
+    :return: List of (x0, x1), left to right.
+    """
+    cells = [t for row in rows if len(row) >= min_cells for t in row]
+    if not cells:
+        cells = [t for row in rows for t in row]
+
+    bands = []
+    for x0, x1 in sorted((t.x0, t.x1) for t in cells):
+        if bands and x0 <= bands[-1][1] + gap:
+            bands[-1][1] = max(bands[-1][1], x1)
+        else:
+            bands.append([x0, x1])
+    return [tuple(b) for b in bands]
+
+def column_of(x0, x1, bands):
+    """Index of the band that the range x0..x1 overlaps most (nearest band if it overlaps none)."""
+    best, best_overlap = 0, 0.0
+    for i, (b0, b1) in enumerate(bands):
+        overlap = min(b1, x1) - max(b0, x0)
+        if overlap > best_overlap:
+            best, best_overlap = i, overlap
+    if best_overlap > 0:
+        return best
+    center = (x0 + x1) / 2
+    return min(range(len(bands)), key=lambda i: min(abs(center - bands[i][0]), abs(center - bands[i][1])))
+
+def anchor_bands(bands, header):
+    """
+    Merge column bands into one column per header cell.
+    Headers are often centred over a column while the values are left/right aligned,
+    so the sweep can split one column into several bands. Each band joins the header
+    cell it overlaps most (or the nearest one).
+    :param header: Tokens of the header row, left to right.
+    """
+    if not header:
+        return bands
+    columns = [None] * len(header)
+    for band in bands:
+        x0, x1 = band
+        i = column_of(x0, x1, [(t.x0, t.x1) for t in header])
+        if columns[i] is not None:
+            x0, x1 = min(x0, columns[i][0]), max(x1, columns[i][1])
+        columns[i] = (x0, x1)
+    return [c for c in columns if c is not None]
+
+def header_rules(rules, header):
+    """
+    x positions of the vertical rules that cross the header row, left to right
+    (close ones merged). These are the column separators of a ruled table.
+    :param rules: (x, top, bottom) from hybrid_pdf.vertical_rules().
+    """
+    top = min(t.top for t in header)
+    bottom = max(t.bottom for t in header)
+    middle = (top + bottom) / 2
+    min_length = MIN_RULE_HEIGHT * (bottom - top)
+    xs = []
+    for x in sorted(x for x, r_top, r_bottom in rules if r_top <= middle <= r_bottom and r_bottom - r_top >= min_length):
+        if xs and x - xs[-1] <= RULE_MERGE:
+            continue
+        xs.append(x)
+    return xs
+
+def rule_bands(xs, rows):
+    """Column bands between consecutive rules, plus the margins if any token lies outside them."""
+    bands = list(zip(xs, xs[1:]))
+    left = min(t.x0 for row in rows for t in row)
+    right = max(t.x1 for row in rows for t in row)
+    if left < xs[0]:
+        bands.insert(0, (left, xs[0]))
+    if right > xs[-1]:
+        bands.append((xs[-1], right))
+    return bands
+
+def build_grid(rows, bands=None, header=True, rules=None):
+    """
+    Rows of tokens -> cell grid. Tokens in the same row and column are joined with a space.
+    :param rows: From token_rows(), usually starting at the header row.
+    :param bands: Column x ranges to use (e.g. from the previous page of the same table);
+                  computed from the rows when None.
+    :param header: rows[0] is the header row; computed bands are anchored to its cells.
+    :param rules: Vertical ruling lines of the page (hybrid_pdf.vertical_rules()). When
+                  the header row is ruled, its cells give the columns instead of the sweep.
+    :return: (DataFrame of str/None without header, like read_sheet_values(), column bands)
+    """
+    if not rows:
+        return pd.DataFrame(), []
+    if bands is None:
+        xs = header_rules(rules, rows[0]) if rules and header else []
+        bands = rule_bands(xs, rows) if len(xs) >= 2 else column_bands(rows)
+        if header:
+            bands = anchor_bands(bands, rows[0])
+
+    grid = []
+    for row in rows:
+        cells = [[] for _ in bands]
+        for t in row:
+            cells[column_of(t.x0, t.x1, bands)].append(t.text)
+        grid.append([join_text(c) if c else None for c in cells])
+    return pd.DataFrame(grid, dtype=object), bands
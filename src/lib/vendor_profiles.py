@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import column_index_from_string, coordinate_to_tuple
+
+# Known vendor layouts (config/vendor_profiles.json). A quotation whose filename contains
+# one of a profile's keywords and whose sheet matches its fingerprint is read from the
+# profile's fixed columns, without header detection.
+PROFILE_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'vendor_profiles.json')
+PROFILE_VERSION = 1
+
+# Item keys a profile can map to a column (same names as the master list items)
+ITEM_KEYS = ('part_no', 'name', 'quantity', 'unit', 'unit_price', 'amount')
+
+@dataclass(frozen=True)
+class VendorProfile:
+    """
+    Layout of one vendor's quotations.
+    :param name: Short id of the profile.
+    :param vendor: Vendor name (加工先 in the master list).
+    :param keywords: Filename keywords of the vendor's files (contained anywhere in the name).
+    :param fingerprint: {cell: text} the sheet must contain (e.g. {'B15': '品名'}) before the
+                        fixed columns are trusted; a changed template falls back to header detection.
+    :param header_row: Row of the table header (1-based, as in Excel).
+    :param first_row: First item row (default: the row below header_row).
+    :param columns: {item key: column letter}.
+    :param end_markers: The table ends at the first row containing one of these.
+    :param roi: Part of a scanned page to OCR (x0, top, x1, bottom) as fractions of the page.
+    """
+    name: str
+    vendor: str = ''
+    keywords: tuple = ()
+    fingerprint: dict = field(default_factory=dict)
+    header_row: int = None
+    first_row: int = None
+    columns: dict = field(default_factory=dict)
+    end_markers: tuple = ()
+    roi: tuple = None
+
+    @classmethod
+    def from_dict(cls, data):
+        columns = data.get('columns') or {}
+        unknown = set(columns) - set(ITEM_KEYS)
+        if unknown:
+            raise ValueError(f"profile {data.get('name')}: unknown column keys {sorted(unknown)}")
+        header_row = data.get('header_row')
+        first_row = data.get('first_row') or (header_row + 1 if header_row else None)
+        roi = data.get('roi')
+        return cls(
+            name=data['name'],
+            vendor=data.get('vendor', ''),
+            keywords=tuple(data.get('keywords', ())),
+            # Cell addresses -> 0-based (row, column) positions of a read_sheet_values() frame
+            fingerprint={_cell_position(cell): text for cell, text in (data.get('fingerprint') or {}).items()},
+            header_row=header_row,
+            first_row=first_row,
+            columns={key: column_index_from_string(letter) - 1 for key, letter in columns.items()},
+            end_markers=tuple(data.get('end_markers', ())),
+            roi=tuple(roi) if roi else None,
+        )
+
+    @property
+    def fixed_columns(self):
+        """True if items can be read from fixed columns (Excel)."""
+        return bool(self.columns) and self.first_row is not None
+
+def _cell_position(cell):
+    row, col = coordinate_to_tuple(cell)
+    return row - 1, col - 1
+
+
+class ProfileIndex:
+    def __init__(self, profiles, digest=None):
+        """
+        Profiles in file order.
+        :param digest: Hash of the profile file (None without one); part of the manifest settings.
+        """
+        self.profiles = list(profiles)
+        self.digest = digest
+
+    def by_filename(self, filename):
+        """First profile with a keyword contained in filename."""
+        for profile in self.profiles:
+            if any(k in filename for k in profile.keywords):
+                return profile
+        return None
+
+    def by_layout(self, df):
+        """First profile whose fingerprint matches the sheet (renamed files)."""
+        for profile in self.profiles:
+            if profile.fingerprint and matches_layout(profile, df):
+                return profile
+        return None
+
+def load_profiles(path=PROFILE_FILE):
+    """Read the profile file. A missing file means no profiles."""
+    if not os.path.exists(path):
+        return ProfileIndex([])
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw.decode('utf-8'))
+    if data.get('version') != PROFILE_VERSION:
+        raise ValueError(f"{path}: unsupported version {data.get('version')}")
+    return ProfileIndex((VendorProfile.from_dict(p) for p in data.get('profiles', [])),
+                        hashlib.sha256(raw).hexdigest())
+
+_cache = {}  # path -> (mtime, ProfileIndex)
+
+def get_index(path=None):
+    """Profiles of path (default: PROFILE_FILE), read again only when the file changes (long-running watch mode)."""
+    path = path or PROFILE_FILE
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        index = load_profiles(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[VendorProfiles] Could not read {path}: {e}. Vendor profiles are not used.")
+        index = ProfileIndex([])
+    _cache[path] = (mtime, index)
+    return index
+
+def matches_layout(profile, df):
+    """True if every fingerprint cell of the profile contains its text."""
+    for (row, col), text in profile.fingerprint.items():
+        if row >= df.shape[0] or col >= df.shape[1]:
+            return False
+        value = df.iat[row, col]
+        if pd.isna(value) or text not in str(value):
+            return False
+    return True
+
+def find_profile(filename, df=None, index=None):
+    """
+    Profile of a quotation file, or None.
+    The filename is looked up first. With df (the sheet values), the profile is only returned
+    if its fingerprint matches, and files with an unknown name are matched by fingerprint.
+    """
+    index = get_index() if index is None else index
+    profile = index.by_filename(filename or '')
+    if df is None:
+        return profile
+    if profile is not None and profile.fixed_columns:
+        return profile if matches_layout(profile, df) else None
+    return index.by_layout(df)
+
+def table_body(df, profile):
+    """
+    Item rows of a sheet read with a profile: from first_row up to the first row containing
+    an end marker, profile columns only, empty rows dropped.
+    :param df: Cell values without header (as read_sheet_values()).
+    :return: DataFrame with one column per mapped item key (original row index kept).
+    """
+    body = df.iloc[profile.first_row - 1:]
+    if profile.end_markers and not body.empty:
+        pattern = re.compile('|'.join(re.escape(m) for m in profile.end_markers))
+        # The marker may sit in any column. Only the distinct cell values are searched; pd.unique keeps
+        # them in order of appearance (row by row), so the first match is in the first marker row
+        cells = body.to_numpy(dtype=object).ravel()
+        marker = next((v for v in pd.unique(cells) if isinstance(v, str) and pattern.search(v)), None)
+        if marker is not None:
+            body = body.iloc[:np.flatnonzero(cells == marker)[0] // body.shape[1]]
+
+    keys = [k for k in ITEM_KEYS if k in profile.columns and profile.columns[k] < df.shape[1]]
+    body = body.iloc[:, [profile.columns[k] for k in keys]]
+    body.columns = keys
+    return body.dropna(how='all')
@@ -0,0 +1,90 @@
+import math
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+TOTAL_MARKER = '総合計'
+
+def scan_master_list(path, index_columns=()):
+    """
+    Read-only pass over the active sheet of the master list.
+    Finds where new rows go (the "総合計" row or the first row with an empty column A,
+    else the end of the sheet) and collects the given columns of the data rows above it.
+    Styles are not loaded, so memory stays small even for a large list.
+    :param path: Path to the workbook.
+    :param index_columns: 1-based column numbers to collect for each data row.
+    :return: (insert row number, list of (row number, {column: value}))
+    """
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        ws = wb.active
+        # The stored <dimension> may be stale (e.g. "A1"); read every row that is actually there
+        ws.reset_dimensions()
+        insert_row_idx = -1
+        rows = []
+        last_row_idx = 1
+        # Assuming header is row 1.
+        for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            last_row_idx = row_idx
+            if not row:
+                insert_row_idx = row_idx
+                break
+            val_a = str(row[0]).strip() if row[0] else ""
+
+            # Check for Total row
+            row_vals = [str(v) if v else "" for v in row]
+            if TOTAL_MARKER in row_vals:
+                insert_row_idx = row_idx
+                break
+
+            # If A is empty, this is the insertion point
+            if not val_a or val_a == 'nan' or val_a == 'None':
+                insert_row_idx = row_idx
+                break
+
+            rows.append((row_idx, {c: (row[c - 1] if len(row) >= c else None) for c in index_columns}))
+
+        if insert_row_idx == -1:
+            # Append below the last row read (ws.max_row comes from the dimension tag)
+            insert_row_idx = last_row_idx + 1
+    finally:
+        wb.close()
+    return insert_row_idx, rows
+
+def _cell_value(value):
+    """pandas/numpy values -> plain values openpyxl can write (NaN becomes an empty cell)."""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    try:
+        import pandas as pd
+        if value is pd.NA or value is pd.NaT:
+            return None
+    except ImportError:
+        pass
+    return value
+
+def write_frame_streaming(df, path, sheet_name='Sheet1'):
+    """
+    Write a DataFrame to .xlsx with a write-only workbook (rows are streamed to
+    disk instead of building every cell in memory). The header row is bold.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+
+    header_font = Font(bold=True)
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=str(name))
+        cell.font = header_font
+        header.append(cell)
+    ws.append(header)
+
+    for row in df.itertuples(index=False, name=None):
+        ws.append([_cell_value(v) for v in row])
+
+    wb.save(path)
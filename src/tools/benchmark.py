@@ -0,0 +1,367 @@
+import sys
+import os
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(os.path.dirname(__file__))
+
+import openpyxl
+from openpyxl.styles import Font, Border, Side
+
+from src.app import extract_quotations as app
+from src.lib.excel_reader import read_sheet_values
+from src.lib.pdf_reader import PDFReader
+from src.lib import instrumentation
+import extract_quotation_details_v3 as extractor
+import update_list
+
+HISTORY_FILE = 'benchmark_history.json'
+
+# Synthetic data in the vendor layouts of config/vendor_profiles.json
+PART_NAMES = ['中板', 'ブラケット', 'プレート', 'シャフト', 'カバー', 'ベース']
+MATERIALS = ['SS400', 'SUS304', 'A5052', 'S45C']
+
+def part_no(i):
+    return f"TEM2521_80-P{i:04d}"
+
+# ---------------------------------------------------------------- generators
+
+def make_makers_workbook(path, n_items):
+    """株式会社メイカーズ (26AA*.xlsx): title in row 1, header in row 15, 品名 B / 図番 C / 単価 E / 金額 F, ends with 小計."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws['A1'] = '御見積書'
+    ws['A3'] = 'TKエンジニアリング 御中'
+    ws['E5'] = '株式会社メイカーズ'
+    ws['A8'] = '件名: 治具部品製作'
+    ws.append([])
+    header_row = 15
+    for col, text in enumerate(['連番', '品名', '図番', '数量', '単価（税別）', '合計金額(税別)'], start=1):
+        ws.cell(row=header_row, column=col, value=text)
+    for i in range(n_items):
+        qty = i % 5 + 1
+        price = 1000 + (i * 37) % 50000
+        ws.append([i + 1, PART_NAMES[i % len(PART_NAMES)], part_no(i), qty, price, qty * price])
+    ws.append([None, '小計', None, None, None, None])
+    ws.append([None, None, '合計', None, None, None])
+    wb.save(path)
+
+def make_qtkg_workbook(path, n_items):
+    """創業實業 (QTKG*.xlsx): header in rows 17-18 with 部品点数 / 図番 (B) / 数量 (D) / 単価 (I) / 金額 (J), ends with 小計."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws['A1'] = 'QUOTATION'
+    ws['A2'] = '創業實業(中国)有限公司'
+    header_row = 17
+    header = ['部品点数', '図番', '客先管理 図番', '数量', '', '予測重量(kg)', '', '図面\n材質', '価格(JPY)', '']
+    sub_header = ['', '', '', '数量', '単位', '単重', '総重', '', '単価', '金額']
+    for col, (text, sub) in enumerate(zip(header, sub_header), start=1):
+        ws.cell(row=header_row, column=col, value=text or None)
+        ws.cell(row=header_row + 1, column=col, value=sub or None)
+    for i in range(n_items):
+        qty = i % 3 + 1
+        price = 800 + (i * 53) % 30000
+        ws.append([i + 1, part_no(i), None, qty, 'PCS', None, None, MATERIALS[i % len(MATERIALS)],
+                   f"¥{price:,}", f"¥{qty * price:,}"])
+    ws.append(['小計', None, None, None, None, None, None, None, None, None])
+    wb.save(path)
+
+def make_tk_ocr_text(n_items, per_page=40):
+    """TKエンジニアリング (PDF): OCR-like text, [図番 品名 材質] 数量 単位 単価 金額 per line."""
+    pages = []
+    lines = []
+    for i in range(n_items):
+        qty = i % 4 + 1
+        price = 1200 + (i * 91) % 60000
+        lines.append(f"{part_no(i)} {PART_NAMES[i % len(PART_NAMES)]} {MATERIALS[i % len(MATERIALS)]} "
+                     f"{qty} 個 {price:,}- {qty * price:,}")
+        if len(lines) == per_page:
+            pages.append(lines)
+            lines = []
+    if lines:
+        pages.append(lines)
+    return pages
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def make_text_pdf(path, pages):
+    """Minimal PDF with a real text layer (ASCII, Helvetica), one list of lines per page."""
+    objects = []  # object bodies, object number = index + 1
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for lines in pages:
+        stream_lines = [b"BT /F1 9 Tf 40 800 Td 12 TL"]
+        for line in lines:
+            stream_lines.append(f"({_pdf_escape(line)}) '".encode('latin-1', 'replace'))
+        stream_lines.append(b"ET")
+        stream = b"\n".join(stream_lines)
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 595 842] "
+                            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>".encode()))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_obj} 0 R >>".encode()
+    kids = " ".join(f"{p} 0 R" for p in page_ids)
+    objects[pages_obj - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        out.write(f"{off:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    with open(path, 'wb') as f:
+        f.write(out.getvalue())
+
+def make_scanned_pdf(path, pages, dpi=200, ruled=False):
+    """
+    Image-only PDF (no text layer), like a scanned quotation. Lines are drawn with PIL's default font.
+    :param ruled: Draw the lines as rows of a ruled table (No. | line), like a printed form.
+    """
+    from PIL import Image, ImageDraw
+    images = []
+    left, top, row = dpi // 2, dpi // 2, 30
+    for lines in pages:
+        im = Image.new('L', (int(8.27 * dpi), int(11.69 * dpi)), 255)
+        draw = ImageDraw.Draw(im)
+        for n, line in enumerate(lines):
+            # The default bitmap font has no Japanese glyphs; keep the ASCII part
+            text = line.encode('ascii', 'ignore').decode()
+            if ruled:
+                draw.text((left + 10, top + n * row + 10), str(n + 1), fill=0)
+                text_x = left + 70
+            else:
+                text_x = left
+            draw.text((text_x, top + n * row + (10 if ruled else 0)), text, fill=0)
+        if ruled and lines:
+            right, bottom = im.width - left, top + len(lines) * row
+            for n in range(len(lines) + 1):
+                draw.line([(left, top + n * row), (right, top + n * row)], fill=0, width=2)
+            for x in (left, left + 60, right):
+                draw.line([(x, top), (x, bottom)], fill=0, width=2)
+        images.append(im)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+
+def make_master_list(path, n_rows):
+    """
+    加工品リスト.xlsx: 17 columns, styled data rows, a 総合計 row at the bottom.
+    Rows use the same drawing numbers / vendor as the QTKG items so the upsert stage finds matches.
+    """
+    vendor = update_list.detect_vendor('QTKG')
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['図面番号', None, '名称', None, '材質', '表面処理', '1台分', '製作分', '単価①', '加工先①',
+               '単価②', '加工先②', '処理単価', '処理先', '合計', None, '備考'])
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    font = Font(name='Meiryo', size=9)
+    for i in range(n_rows):
+        ws.append([part_no(i), None, PART_NAMES[i % len(PART_NAMES)], None, MATERIALS[i % len(MATERIALS)],
+                   None, 1, 1, 900 + i, vendor, None, None, None, None, 900 + i, None, None])
+        for col in range(1, 18):
+            cell = ws.cell(row=i + 2, column=col)
+            cell.border = border
+            cell.font = font
+    ws.append([])
+    ws.append([None] * 13 + ['総合計'])
+    wb.save(path)
+
+# ---------------------------------------------------------------- timing
+
+def time_stage(func, repeat):
+    """Run func() `repeat` times (output suppressed). Returns (timings in seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        # The pipeline records spans in the process-wide metrics; do not let them pile up
+        instrumentation.METRICS.reset()
+    return timings, result
+
+def summarize(result):
+    """Short description of a stage result, to spot a "fast because it found nothing" run."""
+    if hasattr(result, 'shape'):
+        return f"{result.shape[0]} rows"
+    if isinstance(result, str):
+        return f"{len(result)} chars"
+    if isinstance(result, list):
+        return f"{len(result)} items"
+    return repr(result)
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+def build_stages(work_dir, args):
+    """Generate the synthetic inputs and return a list of (stage name, function, input items)."""
+    makers = os.path.join(work_dir, '26AA0001_御見積書.xlsx')
+    qtkg = os.path.join(work_dir, 'QTKG20260101A01-1.XLSX')
+    text_pdf = os.path.join(work_dir, '20260101TKエンジニアリング御中.pdf')
+    scanned_pdf = os.path.join(work_dir, '注文No.20260101MT01.pdf')
+    ruled_pdf = os.path.join(work_dir, '注文No.20260101MT02.pdf')
+    master = os.path.join(work_dir, '加工品リスト.xlsx')
+    master_copy = os.path.join(work_dir, 'master_run.xlsx')
+
+    make_makers_workbook(makers, args.rows)
+    make_qtkg_workbook(qtkg, args.rows)
+    ocr_pages = make_tk_ocr_text(args.rows)
+    make_text_pdf(text_pdf, ocr_pages)
+    make_master_list(master, args.master_rows)
+    ocr_text = "\n".join(f"--- Page {i + 1} ---\n" + "\n".join(p) for i, p in enumerate(ocr_pages))
+
+    update_items = [{'part_no': part_no(i), 'name': PART_NAMES[i % len(PART_NAMES)], 'unit_price': 1000 + i,
+                     'amount': 2000 + i, 'source_file': 'QTKG20260101A01-1.XLSX'} for i in range(args.rows)]
+
+    def run_update(upsert):
+        def run():
+            shutil.copy(master, master_copy)
+            return update_list.update_excel(update_items, upsert=upsert, target_file=master_copy)
+        return run
+
+    raw_makers = read_sheet_values(makers)
+    text_reader = PDFReader()
+
+    def without_profiles(module, func):
+        """Same stage with header detection instead of the vendor profile (a comparison; the profile is not faster)."""
+        def run():
+            module.VENDOR_PROFILES = False
+            try:
+                return func()
+            finally:
+                module.VENDOR_PROFILES = True
+        return run
+
+    stages = [
+        ('excel_extract_makers', lambda: app.extract_from_excel(makers), args.rows),
+        ('excel_extract_makers_generic', without_profiles(app, lambda: app.extract_from_excel(makers)), args.rows),
+        ('excel_extract_qtkg_v3', lambda: extractor.extract_from_excel(qtkg), args.rows),
+        ('excel_extract_qtkg_v3_generic', without_profiles(extractor, lambda: extractor.extract_from_excel(qtkg)), args.rows),
+        ('header_detect', lambda: app.find_header_row(raw_makers), len(raw_makers)),
+        ('parse_ocr_text', lambda: app.parse_ocr_text(ocr_text, 'tk.pdf'), args.rows),
+        ('pdf_text_layer', lambda: text_reader.extract_text(text_pdf), args.rows),
+        ('pdf_text_layer_v3', lambda: extractor.extract_from_pdf(text_pdf), args.rows),
+        ('update_excel_append', run_update(False), args.rows),
+        ('update_excel_upsert', run_update(True), args.rows),
+    ]
+    if args.ocr:
+        make_scanned_pdf(scanned_pdf, [p[:args.ocr_lines] for p in ocr_pages[:args.ocr_pages]])
+        ocr_items = sum(len(p[:args.ocr_lines]) for p in ocr_pages[:args.ocr_pages])
+        batched_reader = PDFReader()
+        single_reader = PDFReader(ocr_batch_pages=1, ocr_batch_size=1)
+        stages.append(('pdf_ocr', lambda: batched_reader.extract_text(scanned_pdf), ocr_items))
+        stages.append(('pdf_ocr_unbatched', lambda: single_reader.extract_text(scanned_pdf), ocr_items))
+        # Same lines in a ruled table: recogniser only per cell vs. detector + recogniser
+        make_scanned_pdf(ruled_pdf, [p[:args.ocr_lines] for p in ocr_pages[:args.ocr_pages]], ruled=True)
+        cell_reader = PDFReader()
+        detector_reader = PDFReader(cell_ocr=False)
+        stages.append(('pdf_ocr_cells', lambda: cell_reader.extract_text(ruled_pdf), ocr_items))
+        stages.append(('pdf_ocr_detector', lambda: detector_reader.extract_text(ruled_pdf), ocr_items))
+    return stages
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"Could not read {path}. Starting a new history.")
+        return []
+
+def previous_run(history, params):
+    """Most recent run with the same sizes (only those are comparable)."""
+    for run in reversed(history):
+        if run.get('params') == params:
+            return run
+    return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the quotation extraction pipeline on synthetic quotations.')
+    parser.add_argument('--rows', type=int, default=1000, help='Line items per synthetic quotation (default: 1000)')
+    parser.add_argument('--master-rows', type=int, default=500, help='Existing rows in the synthetic master list (default: 500)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage; the best run is reported (default: 3)')
+    parser.add_argument('--ocr', action='store_true', help='Also benchmark OCR on a scanned PDF (needs the EasyOCR model)')
+    parser.add_argument('--ocr-pages', type=int, default=2, help='Pages of the scanned PDF (default: 2)')
+    parser.add_argument('--ocr-lines', type=int, default=20, help='Lines per scanned page (default: 20)')
+    parser.add_argument('--stages', nargs='*', help='Only run these stages')
+    parser.add_argument('--history', default=HISTORY_FILE, help=f'JSON history file (default: {HISTORY_FILE})')
+    parser.add_argument('--no-save', action='store_true', help='Do not append this run to the history')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = {'rows': args.rows, 'master_rows': args.master_rows, 'repeat': args.repeat,
+              'ocr': args.ocr, 'ocr_pages': args.ocr_pages, 'ocr_lines': args.ocr_lines}
+
+    history = load_history(args.history)
+    baseline = previous_run(history, params)
+    baseline_stages = baseline['stages'] if baseline else {}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"Generating synthetic quotations ({args.rows} items)...")
+        stages = build_stages(work_dir, args)
+
+        print(f"\n{'stage':<24}{'best [ms]':>12}{'mean [ms]':>12}{'items':>8}{'items/s':>12}{'vs prev':>10}  output")
+        for name, func, items in stages:
+            if args.stages and name not in args.stages:
+                continue
+            try:
+                timings, result = time_stage(func, args.repeat)
+            except Exception as e:
+                print(f"{name:<24} failed: {e}")
+                continue
+            best = min(timings)
+            results[name] = {'best_s': best, 'mean_s': sum(timings) / len(timings), 'items': items,
+                             'output': summarize(result)}
+
+            prev = baseline_stages.get(name)
+            delta = f"{(best / prev['best_s'] - 1) * 100:+.0f}%" if prev and prev['best_s'] > 0 else '-'
+            rate = f"{items / best:,.0f}" if items and best > 0 else '-'
+            print(f"{name:<24}{best * 1000:>12.1f}{results[name]['mean_s'] * 1000:>12.1f}{items:>8}{rate:>12}{delta:>10}  {results[name]['output']}")
+
+    if baseline:
+        print(f"\nCompared with run of {baseline['timestamp']} (commit {baseline.get('commit') or '?'}).")
+
+    if not args.no_save:
+        history.append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'params': params,
+            'stages': results,
+        })
+        with open(args.history, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+        print(f"Saved to {args.history}")
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,28 @@
 import pdfplumber
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.lib.file_discovery import scan_files
 
 pdf_dir = '見積書'
 results = []
 
 print(f"Checking PDFs in {pdf_dir}...")
 
-for filename in os.listdir(pdf_dir):
-    if filename.lower().endswith('.pdf'):
-        path = os.path.join(pdf_dir, filename)
-        try:
-            with pdfplumber.open(path) as pdf:
-                first_page = pdf.pages[0]
-                text = first_page.extract_text()
-                if text and len(text.strip()) > 50:
-                    results.append((filename, "Text-based (OK)", len(text)))
-                else:
-                    results.append((filename, "Image-based or Empty (Might need OCR)", 0))
-        except Exception as e:
-            results.append((filename, f"Error: {e}", 0))
+for entry in scan_files(pdf_dir, include=('*.pdf',)):
+    filename = entry.relpath
+    path = entry.path
+    try:
+        with pdfplumber.open(path) as pdf:
+            first_page = pdf.pages[0]
+            text = first_page.extract_text()
+            if text and len(text.strip()) > 50:
+                results.append((filename, "Text-based (OK)", len(text)))
+            else:
+                results.append((filename, "Image-based or Empty (Might need OCR)", 0))
+    except Exception as e:
+        results.append((filename, f"Error: {e}", 0))
 
 print("\n--- Results ---")
 for res in results:
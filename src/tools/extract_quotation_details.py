@@ -1,25 +1,21 @@
 import os
 import pandas as pd
 import pdfplumber
-import easyocr
 import numpy as np
 import re
 import logging
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.lib.ocr_engine import get_ocr_reader as shared_ocr_reader
 
 # Suppress warnings
 logging.getLogger('easyocr').setLevel(logging.ERROR)
 
 TARGET_DIR = r'c:\Users\taman\OneDrive\デスクトップ\作業中\104.ai_workspaces\excel_work\見積書\加工品'
 
-# OCR Reader (initialized lazily)
-_ocr_reader = None
-
 def get_ocr_reader():
-    global _ocr_reader
-    if _ocr_reader is None:
-        print("Initializing EasyOCR...")
-        _ocr_reader = easyocr.Reader(['ja', 'en'])
-    return _ocr_reader
+    return shared_ocr_reader()
 
 def clean_text(text):
     if not isinstance(text, str):
@@ -1,26 +1,42 @@
 import os
 import pandas as pd
 import pdfplumber
-import easyocr
 import numpy as np
-import re
 import logging
+import sys
 import warnings
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.lib.ocr_engine import get_ocr_reader as shared_ocr_reader
+from src.lib.excel_reader import read_sheet_values
+from src.lib import header_detect
+from src.lib import patterns
+from src.lib.ocr_render import DEFAULT_PROFILE
+from src.lib.cell_ocr import ocr_pages
+from src.lib import hybrid_pdf
+from src.lib import table_grid
+from src.lib import vendor_profiles
+from src.lib.file_discovery import scan_files
+
 # Suppress warnings
 warnings.simplefilter(action='ignore', category=UserWarning)
 logging.getLogger('easyocr').setLevel(logging.ERROR)
 
 TARGET_DIR = r'c:\Users\taman\OneDrive\デスクトップ\作業中\104.ai_workspaces\excel_work\見積書\加工品'
 
-_ocr_reader = None
-
 def get_ocr_reader():
-    global _ocr_reader
-    if _ocr_reader is None:
-        print("Initializing EasyOCR...")
-        _ocr_reader = easyocr.Reader(['ja', 'en'])
-    return _ocr_reader
+    return shared_ocr_reader()
+
+HEADER_KEYWORDS = {
+    'part_no': [r'図番', r'図\s*番', r'品番', r'図面', r'製品番号'],
+    'name': [r'品名', r'品\s*名', r'名称', r'商品名', r'件名'],
+    'unit_price': [r'単価', r'単\s*価', r'価格'],
+    'amount': [r'金額', r'金\s*額', r'小計', r'合計']
+}
+HEADER_PATTERNS = header_detect.compile_keyword_patterns(HEADER_KEYWORDS, literal=False)
+ITEM_COLUMNS = ['part_no', 'name', 'unit_price', 'amount']
+OCR_PROFILE = DEFAULT_PROFILE
+VENDOR_PROFILES = True  # Known vendors: fixed columns from config/vendor_profiles.json (e.g. QTKG's two header rows)
 
 def clean_text(text):
     if not isinstance(text, str):
@@ -31,10 +47,9 @@ def parse_price(text):
     text = str(text)
     # Extract number from string like "¥1,000", "1,000-", "1000"
     # remove dates or phone numbers
-    if re.search(r'\d{4}[-/年]\d{1,2}[-/月]', text): return 0
-    if re.search(r'\d{2,4}-\d{2,4}-\d{4}', text): return 0
+    if patterns.DATE_OR_PHONE.search(text): return 0
     
-    match = re.search(r'[\d,]+', text)
+    match = patterns.NUMBER.search(text)
     if match:
         try:
             return int(match.group().replace(',', ''))
@@ -42,172 +57,250 @@ def parse_price(text):
             return 0
     return 0
 
+def parse_price_series(values):
+    """Column version of parse_price() for a Series of cleaned strings ('' = empty)."""
+    text = values.astype(str)
+    # remove dates or phone numbers
+    is_date_or_phone = text.str.contains(patterns.DATE_OR_PHONE, regex=True)
+    digits = text.str.extract(f'({patterns.NUMBER.pattern})', expand=False).str.replace(',', '', regex=False)
+    prices = pd.to_numeric(digits, errors='coerce').fillna(0).astype('int64')
+    return prices.mask(is_date_or_phone.to_numpy(dtype=bool), 0)
+
+def clean_column(values):
+    """Column version of clean_text(); missing cells become ''."""
+    text = values.astype(object).where(values.notna(), '').astype(str)
+    return text.str.strip().str.replace('　', ' ', regex=False)
+
+def items_from_frame(df, header_idx, col_map):
+    """
+    Item rows below a detected header of a sheet-like frame (Excel sheet or PDF table).
+    :param df: Cell values, no header (as read_sheet_values()).
+    :param header_idx: Index label of the header row (from header_detect.best_header_row).
+    :param col_map: {item key: column position} (from header_detect.best_header_row).
+    """
+    # Rows after header, mapped columns only
+    start = df.index.get_loc(header_idx) + 1
+    keys = [k for k in ITEM_COLUMNS if k in col_map]
+    body = df.iloc[start:, [col_map[k] for k in keys]]
+    body.columns = keys
+    return items_from_body(body)
+
+def items_from_body(body):
+    """
+    Clean item rows from table cells whose columns are named by item key
+    (the mapped columns of items_from_frame(), or vendor_profiles.table_body()).
+    """
+    keys = [k for k in ITEM_COLUMNS if k in body.columns]
+    cleaned = body[keys].apply(clean_column)
+
+    items = pd.DataFrame(index=cleaned.index)
+    for key in keys:
+        present = cleaned[key] != ''
+        if key in ('unit_price', 'amount'):
+            # Normalize numeric values
+            items[key] = parse_price_series(cleaned[key]).astype('Int64').where(present, pd.NA)
+        else:
+            items[key] = cleaned[key].where(present, None)
+
+    # Heuristic: Valid row should have a part number OR amount
+    valid = pd.Series(False, index=items.index)
+    if 'part_no' in items:
+        valid |= items['part_no'].notna()
+    if 'amount' in items:
+        valid |= items['amount'].fillna(0) != 0
+    # Filter out rows that are just comments or emptyish
+    for key in ('part_no', 'name'):
+        if key in items:
+            valid &= items[key] != 'nan'
+
+    return items[valid.to_numpy(dtype=bool)].reset_index(drop=True)
+
 def extract_from_excel(file_path):
     print(f"\nProcessing Excel: {os.path.basename(file_path)}")
     try:
-        df = pd.read_excel(file_path, header=None)
-        
+        df = read_sheet_values(file_path)
+
+        # Known vendor layout: fixed columns, no header search
+        profile = vendor_profiles.find_profile(os.path.basename(file_path), df) if VENDOR_PROFILES else None
+        if profile is not None:
+            items = items_from_body(vendor_profiles.table_body(df, profile))
+            if not items.empty:
+                print(f"  Vendor profile '{profile.name}' (header row {profile.header_row}). Columns: {profile.columns}")
+                return items
+            print(f"  Vendor profile '{profile.name}' found no items. Detecting the header.")
+
         # Determine header row with scoring
-        best_header_row_idx = -1
-        best_score = 0
-        best_col_map = {}
-        
-        keywords = {
-            'part_no': [r'図番', r'図\s*番', r'品番', r'図面', r'製品番号'],
-            'name': [r'品名', r'品\s*名', r'名称', r'商品名', r'件名'],
-            'unit_price': [r'単価', r'単\s*価', r'価格'],
-            'amount': [r'金額', r'金\s*額', r'小計', r'合計']
-        }
-        
-        for idx, row in df.iterrows():
-            row_text = [clean_text(str(val)) for val in row.values]
-            found_cols = {}
-            found_keys = set()
-            
-            for col_idx, text in enumerate(row_text):
-                for key, patterns in keywords.items():
-                    # If this key is already found for this row, skip (or overwrite?)
-                    if key in found_keys: continue
-                    
-                    for pattern in patterns:
-                        if re.search(pattern, text):
-                            found_cols[key] = col_idx
-                            found_keys.add(key)
-                            break
-            
-            score = len(found_keys)
-            # We want headers that have at least 2 distinct types of info
-            if score > best_score and score >= 2:
-                best_score = score
-                best_header_row_idx = idx
-                best_col_map = found_cols
+        # We want headers that have at least 2 distinct types of info
+        best_header_row_idx, best_score, best_col_map = header_detect.best_header_row(df, HEADER_PATTERNS, min_score=2)
                 
-        if best_header_row_idx == -1:
+        if best_header_row_idx is None:
             print("  Could not detect header row.")
-            return []
+            return pd.DataFrame(columns=ITEM_COLUMNS)
             
         print(f"  Best Header detected at row {best_header_row_idx+1} (Score: {best_score}). Columns: {best_col_map}")
         
-        results = []
-        # Iterate rows after header
-        for idx in range(best_header_row_idx + 1, len(df)):
-            row = df.iloc[idx]
-            
-            item = {}
-            has_data = False
+        return items_from_frame(df, best_header_row_idx, best_col_map)
+
+    except Exception as e:
+        print(f"  Error reading Excel: {e}")
+        return pd.DataFrame(columns=ITEM_COLUMNS)
+
+def items_from_tables(page):
+    """Items from the ruled tables of a page's text layer (no OCR). Returns a list of DataFrames."""
+    frames = []
+    for table in page.extract_tables():
+        df = pd.DataFrame(table)
+        header_idx, score, col_map = header_detect.best_header_row(df, HEADER_PATTERNS, min_score=2)
+        if header_idx is None:
+            continue
+        items = items_from_frame(df, header_idx, col_map)
+        if not items.empty:
+            frames.append(items)
+    return frames
+
+def items_from_tokens(tokens, rules=None):
+    """
+    Items from positioned tokens (text-layer words / OCR boxes) rebuilt into a cell grid
+    (see src/lib/table_grid.py). Returns a DataFrame, or None if no table header is found.
+    """
+    rows = table_grid.token_rows(tokens)
+    start = table_grid.find_header(rows, HEADER_PATTERNS, required=('name', 'amount'))
+    if start is None:
+        return None
+    grid, _ = table_grid.build_grid(rows[start:], rules=rules)
+    header_idx, score, col_map = header_detect.best_header_row(grid.iloc[:1], HEADER_PATTERNS, min_score=2)
+    if header_idx is None:
+        return None
+    items = items_from_frame(grid, header_idx, col_map)
+    return None if items.empty else items
+
+def parse_item_lines(lines):
+    """
+    Items from text pieces in reading order (OCR boxes, or text-layer phrases).
+    A part number starts an item; the prices that follow are its unit price and amount.
+    """
+    results = []
+    # Context buffer to associate price with previous part
+    current_item = {}
+    
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        
+        # 1. Check for Part Number pattern (e.g. TEM2521...)
+        # Uppercase followed by digits
+        part_match = patterns.PART_NO.search(line)
+        
+        if part_match and len(part_match.group(1)) > 4:
+            # If we have a pending item, save it
+            if current_item:
+                results.append(current_item)
+                current_item = {}
+                
+            # Split part no and potential name
+            # Assuming structure "PartNo Name" or "PartNoName"
+            # We use the match end to split
+            part_no = part_match.group(1)
+            current_item['part_no'] = part_no
             
-            # Extract available columns
-            for key, col_idx in best_col_map.items():
-                val = row[col_idx]
-                if pd.notna(val):
-                    val_str = clean_text(str(val))
-                    if val_str:
-                        item[key] = val_str
-                        has_data = True
+            # The rest of the line is likely the name
+            rest = line.replace(part_no, '').strip()
+            # If rest starts with special chars, clean
+            rest = patterns.NAME_PREFIX_JUNK.sub('', rest)
+            if rest:
+                current_item['name'] = rest
             
-            # Normalize numeric values
-            if 'unit_price' in item:
-                item['unit_price'] = parse_price(item['unit_price'])
-            if 'amount' in item:
-                item['amount'] = parse_price(item['amount'])
-                
-            # Heuristic: Valid row should have a part number OR amount
-            if has_data and (item.get('part_no') or item.get('amount')):
-                # Filter out rows that are just comments or emptyish
-                if item.get('part_no') == 'nan' or item.get('name') == 'nan': continue
-                results.append(item)
+            continue
+
+        # 2. Check for Price / Amount
+        # Valid price should be number, maybe with comma, maybe with -
+        # Avoid phone numbers (06-..., 072-...)
+        if patterns.PHONE_LINE.search(line): continue
+        
+        # Look for prices
+        # 9,000- or 9000
+        price_match = patterns.TRAILING_PRICE.search(line)
+        if price_match:
+            price_val = parse_price(price_match.group(1))
+            if price_val > 100: # Filter out small numbers like qty "1" or "2"
+                if 'unit_price' not in current_item:
+                    current_item['unit_price'] = price_val
+                elif 'amount' not in current_item:
+                    current_item['amount'] = price_val
         
-        return results
+        # 3. Check for specific Kana (Name candidate if not set)
+        if 'part_no' in current_item and 'name' not in current_item:
+            if patterns.JAPANESE_TEXT.search(line):
+                 current_item['name'] = line
 
-    except Exception as e:
-        print(f"  Error reading Excel: {e}")
-        return []
+    # Append last item
+    if current_item:
+        results.append(current_item)
+    return results
 
 def extract_from_pdf(file_path):
     print(f"\nProcessing PDF: {os.path.basename(file_path)}")
-    reader = get_ocr_reader()
-    results = []
+    filename = os.path.basename(file_path)
+    frames = [] # items per page (or per table), in page order
     
     try:
         with pdfplumber.open(file_path) as pdf:
             for i, page in enumerate(pdf.pages):
-                im = page.to_image(resolution=300).original
-                img_np = np.array(im)
-                ocr_result = reader.readtext(img_np, detail=0)
-                
-                # Context buffer to associate price with previous part
-                current_item = {}
-                
-                for line in ocr_result:
-                    line = line.strip()
-                    if not line: continue
-                    
-                    # 1. Check for Part Number pattern (e.g. TEM2521...)
-                    # Uppercase followed by digits
-                    part_match = re.search(r'([A-Z]+\d+[_\-0-9A-Z]*)', line)
-                    
-                    if part_match and len(part_match.group(1)) > 4:
-                        # If we have a pending item, save it
-                        if current_item:
-                            results.append(current_item)
-                            current_item = {}
-                            
-                        # Split part no and potential name
-                        # Assuming structure "PartNo Name" or "PartNoName"
-                        # We use the match end to split
-                        part_no = part_match.group(1)
-                        current_item['part_no'] = part_no
-                        
-                        # The rest of the line is likely the name
-                        rest = line.replace(part_no, '').strip()
-                        # If rest starts with special chars, clean
-                        rest = re.sub(r'^[_:|\- ]+', '', rest)
-                        if rest:
-                            current_item['name'] = rest
-                        
+                # Text layer first; OCR only the parts it does not cover
+                words = hybrid_pdf.text_tokens(page)
+                regions = hybrid_pdf.untexted_regions(page, words)
+
+                rules = hybrid_pdf.vertical_rules(page)
+
+                if not regions:
+                    # Digitally generated page: ruled tables, else text pieces like OCR boxes
+                    tables = items_from_tables(page)
+                    if tables:
+                        frames.extend(tables)
                         continue
+                    tokens = words
+                    lines = [t.text for t in hybrid_pdf.phrases(words)]
+                else:
+                    # OCR only the line-item table (vendor override or detected ruling lines) / image regions;
+                    # ruled tables are read cell by cell without the text detector
+                    crops = hybrid_pdf.region_crops(page, regions, filename)
+                    outputs = ocr_pages(get_ocr_reader(), crops, OCR_PROFILE)
+                    ocr_tokens = [t for crop, (res, dpi) in zip(crops, outputs)
+                                  for t in hybrid_pdf.ocr_tokens(res, crop, dpi)]
+                    tokens = words + ocr_tokens
+                    if words:
+                        lines = [t.text for t in hybrid_pdf.phrases(tokens)]
+                    else:
+                        lines = [r[1] for res, dpi in outputs for r in res]
 
-                    # 2. Check for Price / Amount
-                    # Valid price should be number, maybe with comma, maybe with -
-                    # Avoid phone numbers (06-..., 072-...)
-                    if re.search(r'0\d{1,4}-\d{1,4}-\d{4}', line): continue
-                    
-                    # Look for prices
-                    # 9,000- or 9000
-                    price_match = re.search(r'([\d,]+)-?$', line)
-                    if price_match:
-                        price_val = parse_price(price_match.group(1))
-                        if price_val > 100: # Filter out small numbers like qty "1" or "2"
-                            if 'unit_price' not in current_item:
-                                current_item['unit_price'] = price_val
-                            elif 'amount' not in current_item:
-                                current_item['amount'] = price_val
-                    
-                    # 3. Check for specific Kana (Name candidate if not set)
-                    if 'part_no' in current_item and 'name' not in current_item:
-                        if re.search(r'[ぁ-んァ-ン一-龥]{2,}', line):
-                             current_item['name'] = line
-
-                # Append last item
-                if current_item:
-                    results.append(current_item)
+                # Cell grid from the token positions; line parsing if no table header is found
+                grid_items = items_from_tokens(tokens, rules)
+                if grid_items is not None:
+                    frames.append(grid_items)
+                    continue
+
+                results = parse_item_lines(lines)
+                if results:
+                    frames.append(pd.DataFrame(results, columns=[c for c in ITEM_COLUMNS if any(c in r for r in results)]))
 
     except Exception as e:
         print(f"  Error reading PDF: {e}")
     
-    return results
+    if not frames:
+        return pd.DataFrame(columns=[])
+    items = pd.concat(frames, ignore_index=True)
+    return items[[c for c in ITEM_COLUMNS if c in items.columns]]
 
 def main():
     if not os.path.exists(TARGET_DIR):
         print(f"Directory not found: {TARGET_DIR}")
         return
 
-    files = os.listdir(TARGET_DIR)
-    
     all_data = {}
 
-    for file in files:
-        path = os.path.join(TARGET_DIR, file)
+    for entry in scan_files(TARGET_DIR):
+        file = entry.relpath
+        path = entry.path
         if file.lower().endswith(('.xlsx', '.xls')):
             data = extract_from_excel(path)
             all_data[file] = data
@@ -218,14 +311,13 @@ def main():
     print("\n\n--- Final Extraction Results ---")
     for filename, items in all_data.items():
         print(f"\nFile: {filename}")
-        if not items:
+        if items.empty:
             print("  No items extracted.")
             continue
             
         try:
-            df = pd.DataFrame(items)
-            cols = [c for c in ['part_no', 'name', 'unit_price', 'amount'] if c in df.columns]
-            print(df[cols].to_markdown(index=False))
+            cols = [c for c in ITEM_COLUMNS if c in items.columns]
+            print(items[cols].to_markdown(index=False))
         except:
              print(items)
 
@@ -1,13 +1,11 @@
 
 import pdfplumber
-import easyocr
 import sys
 import os
-import numpy as np
 
-# Suppress easyocr warnings
-import logging
-logging.getLogger('easyocr').setLevel(logging.ERROR)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.lib.ocr_engine import get_ocr_reader
+from src.lib.ocr_render import DEFAULT_PROFILE, ocr_page
 
 if len(sys.argv) > 1:
     pdf_path = sys.argv[1]
@@ -19,7 +17,7 @@ if not os.path.exists(pdf_path):
     exit(1)
 
 print(f"Initializing OCR reader... (This may take a moment)")
-reader = easyocr.Reader(['ja', 'en'])
+reader = get_ocr_reader()
 
 try:
     with pdfplumber.open(pdf_path) as pdf:
@@ -27,15 +25,10 @@ try:
         for i, page in enumerate(pdf.pages):
             print(f"\n--- Page {i+1} ---")
             
-            # Convert page to image
-            # resolution=300 is usually good for OCR
-            im = page.to_image(resolution=300).original
-            
-            # Convert PIL image to numpy array for easyocr
-            im_np = np.array(im)
-            
-            # Perform OCR
-            result = reader.readtext(im_np)
+            # Render (grayscale, low DPI first; re-rendered at high DPI if confidence is low)
+            # and perform OCR
+            result, dpi = ocr_page(reader, page, DEFAULT_PROFILE)
+            print(f"(OCR at {dpi} DPI)")
             
             # Print results
             for (bbox, text, prob) in result:
@@ -1,69 +1,14 @@
 import os
 import pandas as pd
-import pdfplumber
-import easyocr
-import numpy as np
-from PIL import Image
 import sys
-import logging
 
-# Suppress EasyOCR warnings
-logging.getLogger('easyocr').setLevel(logging.ERROR)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+# Shared reader: the OCR model is loaded on the first scanned page only
+from src.lib.pdf_reader import PDFReader
 
 # Set directory path
 directory = r'c:\Users\taman\OneDrive\デスクトップ\作業中\104.ai_workspaces\excel_work\見積書\加工品'
 
-class PDFReader:
-    def __init__(self, languages=['ja', 'en']):
-        """
-        Initialize the PDFReader with OCR languages.
-        :param languages: List of languages for OCR (default: ['ja', 'en'])
-        """
-        print("Initializing EasyOCR...")
-        # gpu=False if you don't have a CUDA-compatible GPU, or leave it to auto-detect
-        self.reader = easyocr.Reader(languages)
-
-    def extract_text(self, pdf_path):
-        """
-        Extract text from a PDF file. Automatically switches to OCR if text is sparse.
-        :param pdf_path: Path to the PDF file.
-        :return: Extracted text as a string (pages separated by newlines).
-        """
-        full_text = ""
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages):
-                    # Try standard text extraction first
-                    text = page.extract_text()
-                    
-                    # Heuristic: If text is very short/empty (likely scanned), try OCR
-                    if not text or len(text.strip()) < 50:
-                        print(f"[PDFReader] Page {i+1}: Text sparse/empty. Attempting OCR...")
-                        
-                        try:
-                            # Convert page to image for OCR
-                            # resolution=300 is usually good for OCR
-                            im = page.to_image(resolution=300).original
-                            
-                            # Convert PIL image to numpy array for EasyOCR
-                            img_np = np.array(im)
-                            
-                            # Perform OCR
-                            ocr_result = self.reader.readtext(img_np, detail=0)
-                            text = "\n".join(ocr_result)
-                            print(f"[PDFReader] Page {i+1}: Used OCR.")
-                        except Exception as e_ocr:
-                            print(f"[PDFReader] Page {i+1}: OCR failed: {e_ocr}")
-                    else:
-                        print(f"[PDFReader] Page {i+1}: Used Text Extraction.")
-
-                    full_text += f"\n--- Page {i+1} ---\n{text}\n"
-                    
-        except Exception as e:
-            return f"Error reading PDF: {e}"
-
-        return full_text
-
 def read_excel(file_path):
     print(f"\n==========================================")
     print(f"Reading Excel: {os.path.basename(file_path)}")
@@ -94,17 +39,14 @@ def main():
     files = os.listdir(directory)
     print(f"Files found: {files}")
     
-    # Initialize PDF reader once
-    pdf_reader = None
+    # An OCR failure on one page does not drop the rest of the file
+    pdf_reader = PDFReader(skip_ocr_errors=True)
 
     for file in files:
         file_path = os.path.join(directory, file)
         if file.lower().endswith(('.xlsx', '.xls')):
             read_excel(file_path)
         elif file.lower().endswith('.pdf'):
-            if pdf_reader is None:
-                pdf_reader = PDFReader()
-            
             print(f"\n==========================================")
             print(f"Reading PDF: {os.path.basename(file_path)}")
             print(f"==========================================")
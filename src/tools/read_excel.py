@@ -14,9 +14,9 @@ for file in excel_files:
         
         for sheet_name in xls.sheet_names:
             print(f"\nSheet: {sheet_name}")
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            # Print first 20 rows to get an idea of content
-            print(df.head(20).to_string())
+            # Print first 20 rows to get an idea of content (only those rows are parsed)
+            df = pd.read_excel(xls, sheet_name=sheet_name, nrows=20)
+            print(df.to_string())
             print("-" * 20)
     except Exception as e:
         print(f"Error reading {file}: {e}")
@@ -1,11 +1,17 @@
 import sys
 import os
+import argparse
 import shutil
 from copy import copy
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 # Ensure we can import the extraction tool
 sys.path.append(os.path.dirname(__file__))
 import extract_quotation_details_v3 as extractor
+from src.lib.file_discovery import scan_files
+from src.lib.workbook_stream import scan_master_list
+from src.lib import instrumentation
+from src.lib import vendor_profiles
 
 try:
     import openpyxl
@@ -31,137 +37,231 @@ def get_all_data():
         return []
         
     all_items = []
-    for file in os.listdir(target_dir):
-        path = os.path.join(target_dir, file)
-        items = []
-        if file.lower().endswith(('.xlsx', '.xls')):
-            items = extractor.extract_from_excel(path)
-        elif file.lower().endswith('.pdf'):
-            items = extractor.extract_from_pdf(path)
-            
-        if items:
-            for item in items:
-                # Attach source filename for reference
-                item['source_file'] = file
-                all_items.append(item)
+    for entry in scan_files(target_dir):
+        all_items.extend(extract_items(entry.path))
                 
     return all_items
 
-def copy_style(source_cell, target_cell):
-    """Copy style from source to target cell"""
-    if source_cell.has_style:
-        target_cell.font = copy(source_cell.font)
-        target_cell.border = copy(source_cell.border)
-        target_cell.fill = copy(source_cell.fill)
-        target_cell.number_format = copy(source_cell.number_format)
-        target_cell.protection = copy(source_cell.protection)
-        target_cell.alignment = copy(source_cell.alignment)
-
-def update_excel(data_items):
-    print(f"Updating {os.path.basename(TARGET_FILE)}...")
+def extract_items(path):
+    """Items of one quotation file as dicts (part_no, name, unit_price, amount, source_file)."""
+    file = os.path.basename(path)
+    if file.lower().endswith(('.xlsx', '.xls')):
+        kind = 'excel'
+    elif file.lower().endswith('.pdf'):
+        kind = 'pdf'
+    else:
+        return []
+
+    with instrumentation.span('extract.file', file=file, kind=kind) as record:
+        if kind == 'excel':
+            items = extractor.extract_from_excel(path)
+        else:
+            items = extractor.extract_from_pdf(path)
+        record['rows'] = len(items)
+    instrumentation.incr('files_processed', kind=kind)
+    instrumentation.incr('rows_extracted', len(items), kind=kind)
+
+    if items.empty:
+        return []
+    # Missing cells become None (empty cells in the sheet)
+    items = items.astype(object).where(items.notna(), None)
+    records = items.to_dict('records')
+    for item in records:
+        # Attach source filename for reference
+        item['source_file'] = file
+    return records
+
+# Summary columns (src/app/extract_quotations.py) -> item keys
+SUMMARY_COLUMNS = {'図番/型番': 'part_no', '品名': 'name', '単価': 'unit_price', '金額': 'amount'}
+
+def items_from_summary(df, path):
+    """
+    Items of one quotation from its summary rows (extract_quotations.process_file()), so a
+    file that was just extracted is not read (and OCR'd) a second time for the master list.
+    :return: Same dicts as extract_items(); empty cells are None.
+    """
+    if df.empty:
+        return []
+    items = df[list(SUMMARY_COLUMNS)].rename(columns=SUMMARY_COLUMNS)
+    items = items.astype(object).where(items.notna() & (items != ''), None)
+    # A column the quotation does not have (e.g. no name column) is left out, as in extract_items()
+    items = items.dropna(axis=1, how='all')
+    records = items.to_dict('records')
+    for item in records:
+        item['source_file'] = os.path.basename(path)
+    return records
+
+def row_style_template(ws, row_idx, max_column):
+    """
+    Read the style of every styled cell in a row once.
+    openpyxl keeps fonts, borders, fills, etc. in shared workbook tables and a cell
+    only holds a small array of IDs into them, so new cells can reuse the IDs
+    instead of copying six style objects per cell.
+    :return: List of (column, style ID array).
+    """
+    template = []
+    for col in range(1, max_column + 1):
+        cell = ws.cell(row=row_idx, column=col)
+        if cell.has_style:
+            template.append((col, cell._style))
+    return template
+
+def write_rows(ws, start_row, rows, style_template):
+    """
+    Write a block of rows and apply the reference row style to each of them.
+    :param rows: List of {column: value} dicts, one per row.
+    """
+    for i, values in enumerate(rows):
+        current_row = start_row + i
+        for col, style in style_template:
+            # copy() of the ID array is cheap and keeps later per-cell edits independent
+            ws.cell(row=current_row, column=col)._style = copy(style)
+        for col, value in values.items():
+            ws.cell(row=current_row, column=col, value=value)
+
+# Column indices are 1-based in openpyxl
+COL_PART_NO = 1     # A: 図面番号
+COL_NAME = 3        # C: 名称
+COL_UNIT_PRICE = 9  # I: 単価①
+COL_VENDOR = 10     # J: 加工先① - Optional, identifying from filename
+COL_AMOUNT = 15     # O: 合計
+PRICE_COLUMNS = {COL_UNIT_PRICE: '単価', COL_AMOUNT: '合計'}
+
+def detect_vendor(fname):
+    """Determine vendor from filename ('' if unknown). Vendors are listed in config/vendor_profiles.json."""
+    profile = vendor_profiles.find_profile(fname)
+    return profile.vendor if profile is not None else ""
+
+def item_values(item):
+    """Extracted item -> {column: value} for one master list row."""
+    values = {
+        COL_PART_NO: item.get('part_no', ''),
+        COL_NAME: item.get('name', ''),
+        COL_UNIT_PRICE: item.get('unit_price', ''),
+        COL_AMOUNT: item.get('amount', ''),
+    }
+    vendor_name = detect_vendor(item.get('source_file', ''))
+    if vendor_name:
+        values[COL_VENDOR] = vendor_name
+    return values
+
+def row_key(part_no, vendor):
+    """Upsert key: (図面番号, 加工先)."""
+    part_no = str(part_no).strip() if part_no is not None else ''
+    vendor = str(vendor).strip() if vendor is not None else ''
+    return (part_no, vendor)
+
+def update_excel(data_items, upsert=False, target_file=TARGET_FILE):
+    """
+    Add extracted items to the master list.
+    :param data_items: List of item dicts (part_no, name, unit_price, amount, source_file).
+    :param upsert: Update prices of rows that already exist (same 図面番号 and 加工先)
+                   and append only new parts, instead of appending every item.
+    :param target_file: Master list workbook to update.
+    :return: Dict with the number of 'added' and 'updated' rows.
+    """
+    print(f"Updating {os.path.basename(target_file)}...")
     
-    if not os.path.exists(TARGET_FILE):
+    if not os.path.exists(target_file):
         print("Target Excel file not found!")
-        return
+        return {'added': 0, 'updated': 0}
+
+    # Read-only pass: insertion point and existing keys/prices, without loading styles
+    index_columns = (COL_PART_NO, COL_VENDOR) + tuple(PRICE_COLUMNS) if upsert else ()
+    with instrumentation.span('update.scan'):
+        insert_row_idx, data_rows = scan_master_list(target_file, index_columns)
+
+    existing = {} # (図面番号, 加工先) -> (row number, current values), for upsert
+    if upsert:
+        for row_idx, values in data_rows:
+            existing.setdefault(row_key(values[COL_PART_NO], values[COL_VENDOR]), (row_idx, values))
 
-    wb = openpyxl.load_workbook(TARGET_FILE)
+    new_rows = []
+    pending = {} # key -> values of rows appended in this run
+    changes = [] # (row_idx, col, (part_no, vendor), label, old, new): one per changed cell
+    for item in data_items:
+        values = item_values(item)
+        key = row_key(values[COL_PART_NO], values.get(COL_VENDOR))
+
+        # Items without a drawing number cannot be matched and are always appended
+        if upsert and key[0]:
+            if key in existing:
+                row_idx, current = existing[key]
+                for col, label in PRICE_COLUMNS.items():
+                    new = values[col]
+                    if new not in (None, '') and current[col] != new:
+                        changes.append((row_idx, col, key, label, current[col], new))
+                        current[col] = new
+                continue
+            if key in pending:
+                # Same part twice in this run: keep the latest values
+                pending[key].update(values)
+                continue
+            pending[key] = values
+        new_rows.append(values)
+
+    # Several price cells of one row may change; 'updated' counts rows
+    updated_rows = {row_idx for row_idx, *_ in changes}
+    if upsert:
+        for _, _, (part_no, vendor), label, old, new in changes:
+            print(f"  Updated {part_no} ({vendor or '-'}) {label}: {old} -> {new}")
+        print(f"Upsert: {len(new_rows)} new, {len(changes)} price changes in {len(updated_rows)} rows, "
+              f"{len(data_items) - len(new_rows)} items matched existing rows.")
+        if not new_rows and not changes:
+            print("No changes. The file was not rewritten.")
+            return {'added': 0, 'updated': 0}
+
+    # Full load only when something has to be written (keeps formatting, formulas and merged cells)
+    with instrumentation.span('update.load'):
+        wb = openpyxl.load_workbook(target_file)
     ws = wb.active
-    
-    # Find insertion point
-    # Look for the first empty cell in Column A (Index 1)
-    # OR the row that contains "総合計"
-    
-    insert_row_idx = -1
-    last_data_row_idx = -1
-    
-    # Iterate rows to find where to append
-    # Assuming header is row 1.
-    for row in ws.iter_rows(min_row=2):
-        cell_a = row[0] # Column A
-        val_a = str(cell_a.value).strip() if cell_a.value else ""
-        
-        # Check for Total row
-        # Check all cells in row? User said "上の行を参考にして"
-        # Usually total is in a specific column or just somewhere at the bottom
-        row_vals = [str(c.value) if c.value else "" for c in row]
-        if "総合計" in row_vals:
-            insert_row_idx = cell_a.row
-            break
-        
-        # If A is empty, this might be the insertion point
-        if not val_a or val_a == 'nan' or val_a == 'None':
-            insert_row_idx = cell_a.row
-            break
-            
-        last_data_row_idx = cell_a.row
-
-    if insert_row_idx == -1:
-        # Append to the very end
-        insert_row_idx = ws.max_row + 1
-        
-    print(f"Inserting {len(data_items)} items starting at row {insert_row_idx}")
-    
-    # We will insert new rows. 
-    # Note: insert_rows inserts *above* the specified row index.
-    ws.insert_rows(insert_row_idx, amount=len(data_items))
-    
-    # Reference row for coding style (the row above insertion)
-    ref_row_idx = insert_row_idx - 1
-    if ref_row_idx < 2: ref_row_idx = 2 # Fallback to first data row if existing is empty
-    
-    # Mapping
-    # A: 図面番号 (1)
-    # C: 名称 (3)
-    # I: 単価① (9)
-    # O: 合計 (15)
-    # J: 加工先① (10) - Optional, identifying from filename
-    
-    vendor_map = {
-        '26AA0788': '株式会社メイカーズ',
-        'QTKG': '創業實業(中国)有限公司',
-        'MT05': 'TKエンジニアリング',
-        '注文No': 'TKエンジニアリング'
-    }
-    
-    for i, item in enumerate(data_items):
-        current_row = insert_row_idx + i
-        
-        # Determine vendor from filename
-        vendor_name = ""
-        fname = item.get('source_file', '')
-        for key, val in vendor_map.items():
-            if key in fname:
-                vendor_name = val
-                break
-        
-        # Values to set
-        # Column indices are 1-based in openpyxl
-        ws.cell(row=current_row, column=1).value = item.get('part_no', '')
-        ws.cell(row=current_row, column=3).value = item.get('name', '')
-        ws.cell(row=current_row, column=9).value = item.get('unit_price', '')
-        ws.cell(row=current_row, column=15).value = item.get('amount', '')
+
+    # Updated rows are above the insertion point, so they are not shifted by insert_rows
+    for row_idx, col, _, _, _, new in changes:
+        ws.cell(row=row_idx, column=col).value = new
+
+    if new_rows:
+        print(f"Inserting {len(new_rows)} items starting at row {insert_row_idx}")
         
-        if vendor_name:
-             ws.cell(row=current_row, column=10).value = vendor_name
+        with instrumentation.span('update.insert', rows=len(new_rows)):
+            # Reference row for coding style (the row above insertion)
+            ref_row_idx = insert_row_idx - 1
+            if ref_row_idx < 2: ref_row_idx = 2 # Fallback to first data row if existing is empty
+            # Read it once, before rows are shifted
+            style_template = row_style_template(ws, ref_row_idx, ws.max_column)
 
-        # Copy style from reference row
-        # Iterate all columns in the row
-        for col in range(1, ws.max_column + 1):
-            source_cell = ws.cell(row=ref_row_idx, column=col)
-            target_cell = ws.cell(row=current_row, column=col)
-            copy_style(source_cell, target_cell)
+            # We will insert new rows (one shift of the cells below for the whole block).
+            # Note: insert_rows inserts *above* the specified row index.
+            ws.insert_rows(insert_row_idx, amount=len(new_rows))
+            write_rows(ws, insert_row_idx, new_rows, style_template)
 
-    wb.save(TARGET_FILE)
+    with instrumentation.span('update.save'):
+        wb.save(target_file)
+    instrumentation.incr('rows_added', len(new_rows))
+    instrumentation.incr('rows_updated', len(updated_rows))
     print("Update complete.")
+    return {'added': len(new_rows), 'updated': len(updated_rows)}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=f'Add extracted quotation items to {os.path.basename(TARGET_FILE)}.')
+    parser.add_argument('--upsert', action='store_true',
+                        help='Update prices of existing parts (same 図面番号 and 加工先) and append only new ones')
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help='Write per-stage timings and counters to PATH (.prom: Prometheus text, otherwise JSON lines)')
+    return parser.parse_args(argv)
 
-def main():
-    data = get_all_data()
-    print(f"DEBUG: Found {len(data)} items total.")
-    if not data:
-        print("No data found to update.")
-        return
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        data = get_all_data()
+        print(f"DEBUG: Found {len(data)} items total.")
+        if not data:
+            print("No data found to update.")
+            return
 
-    update_excel(data)
+        update_excel(data, upsert=args.upsert)
+    finally:
+        instrumentation.report(args.metrics_out)
 
 if __name__ == "__main__":
     main()
@@ -5,7 +5,8 @@ target_file = r'c:\Users\taman\OneDrive\デスクトップ\作業中\104.ai_work
 
 print(f"Reading {os.path.basename(target_file)}")
 try:
-    df = pd.read_excel(target_file)
+    # Only the rows we print are parsed
+    df = pd.read_excel(target_file, nrows=15)
     print("--- First 10 rows (including updated ones) ---")
     print(df.head(15).to_markdown())
 except Exception as e: